@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""Benchmark the DFA constructions against each other.
+
+For each rule set, every construction is timed along with the minimization of
+its result, and the number of states before and after minimization is
+reported. Run from the root of the repository:
+
+    python3 benchmarks/constructions.py
+
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylex import derivatives, followpos
+from pylex.ast import asts_to_nfa
+from pylex.reparser import RegexParser
+from pylex.rescanner import RegexScanner
+
+
+def thompson(asts):
+    return asts_to_nfa(asts).to_dfa(bitsets=True, compact=True)
+
+
+CONSTRUCTIONS = [
+    ('thompson', thompson),
+    ('followpos', followpos.asts_to_dfa),
+    ('derivatives', derivatives.asts_to_dfa),
+]
+
+
+def keywords(n):
+    random.seed(1)
+    words = set()
+    while len(words) < n:
+        words.add(''.join(random.choice('abcdefghij') for i in range(random.randint(3, 8))))
+    return sorted(words) + ['[a-z]([a-z0-9])*', '[0-9]+', '[ ]+']
+
+
+RULE_SETS = [
+    ('c-like', ['if', 'else', 'while', 'for', 'return', '[a-zA-Z_]([a-zA-Z_0-9])*',
+                '[0-9]+', '0x([0-9a-fA-F])+', '"([^"\\\\]|\\\\.)*"', '[ \t\n]+',
+                '==|!=|<=|>=|&&|\\|\\|', '.']),
+    ('1500 keywords', keywords(1500)),
+    ('(a|b)*a(a|b)^11', ['(a|b)*a' + '(a|b)' * 11]),
+]
+
+
+def main():
+    print('{:20} {:12} {:>9} {:>8} {:>9} {:>8}'.format(
+        'rules', 'construction', 'time (s)', 'states', 'min (s)', 'minimal'))
+    for (name, regexes) in RULE_SETS:
+        asts = RegexParser(RegexScanner('\n'.join(regexes))).parse_top_level()
+        for (construction, construct) in CONSTRUCTIONS:
+            start = time.perf_counter()
+            dfa = construct(asts)
+            elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            min_dfa = dfa.minimized()
+            min_elapsed = time.perf_counter() - start
+
+            print('{:20} {:12} {:9.3f} {:8} {:9.3f} {:8}'.format(
+                name, construction, elapsed, dfa.num_states, min_elapsed, min_dfa.num_states))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,13 @@ import doctest
 import sys
 
 from pylex.ast import asts_to_nfa
+from pylex.cache import DFACache, compile_rules
+from pylex.dfafile import save_dfa
+from pylex import derivatives, followpos, trie
 from pylex.reparser import RegexParser
 from pylex.rescanner import RegexScanner
-from pylex.scangen import TableDrivenScannerGenerator
+from pylex.simplify import simplify
+from pylex.scangen import DirectCodedScannerGenerator, TableDrivenScannerGenerator
 
 
 def main():
@@ -25,11 +29,38 @@ def main():
                         help='write the DFA for Graphviz dot rendering')
     parser.add_argument('-m', '--min-dfa', type=argparse.FileType('w'), metavar='FILE',
                         help='write the minimized DFA for Graphviz dot rendering')
+    parser.add_argument('-b', '--binary-dfa', type=argparse.FileType('wb'), metavar='FILE',
+                        help='write the minimized DFA in binary form for loading with '
+                             'pylex.dfafile.load_dfa')
     parser.add_argument('-c', '--c-source', type=argparse.FileType('w'),
                         metavar='FILE', default=sys.stdout,
                         help='write the C source code for a scanner (defaults to stdout)')
+    parser.add_argument('-H', '--c-header', type=argparse.FileType('w'), metavar='FILE',
+                        help='write the C header declaring the interface of the scanner')
+    parser.add_argument('--construction', choices=['thompson', 'followpos', 'derivatives'],
+                        default='thompson',
+                        help='construct the DFA from an NFA built with Thompson\'s construction or '
+                             'directly from the regex ASTs with followpos or Brzozowski '
+                             'derivatives (defaults to thompson)')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='cache minimized DFAs in a directory, keyed on the rules')
+    parser.add_argument('--incremental', action='store_true',
+                        help='compile and cache each rule separately and combine them, so only '
+                             'changed rules are recompiled (requires --cache-dir)')
+    parser.add_argument('-g', '--generator', choices=['table', 'direct'], default='table',
+                        help='generate a table-driven or direct-coded scanner (defaults to table)')
+    parser.add_argument('--compress', action='store_true',
+                        help='compress the transition table of a table-driven scanner')
+    parser.add_argument('--computed-goto', action='store_true',
+                        help='dispatch with computed gotos in a direct-coded scanner')
 
     args = parser.parse_args()
+    if args.nfa and args.construction != 'thompson':
+        parser.error('--nfa requires the Thompson construction')
+    if args.incremental and not args.cache_dir:
+        # Without a cache, nothing is kept between runs and compiling each rule
+        # separately is only slower.
+        parser.error('--incremental requires --cache-dir')
 
     rescanner = RegexScanner(sys.stdin, args.lex)
     reparser = RegexParser(rescanner)
@@ -38,21 +69,64 @@ def main():
     for ast in asts:
         if args.ast:
             print(ast, file=args.ast)
+    asts = simplify(asts)
 
-    nfa = asts_to_nfa(asts)
-    if args.nfa:
-        nfa.print_graphviz(args.nfa)
+    # The cache and incremental compilation only produce the minimized DFA,
+    # so they can't be used when the intermediate automata are requested.
+    intermediate = args.nfa or args.dfa
+    cache = None
+    min_dfa = None
+    if args.cache_dir and not intermediate:
+        cache = DFACache(args.cache_dir)
+        key = cache.key(asts)
+        min_dfa = cache.get(key)
 
-    dfa = nfa.to_dfa()
-    if args.dfa:
-        dfa.print_graphviz(args.dfa)
+    if args.construction == 'followpos':
+        construct = followpos.asts_to_dfa
+    elif args.construction == 'derivatives':
+        construct = derivatives.asts_to_dfa
+    else:
+        construct = None
+
+    if min_dfa is not None:
+        pass
+    elif args.incremental and not intermediate:
+        min_dfa = compile_rules(asts, cache, construct)
+        if cache:
+            cache.put(key, min_dfa)
+    elif not intermediate:
+        # Rules which are literal strings are compiled straight to a trie.
+        min_dfa = trie.compile_rules(asts, construct)
+        if cache:
+            cache.put(key, min_dfa)
+    else:
+        if construct:
+            dfa = construct(asts)
+        else:
+            nfa = asts_to_nfa(asts)
+            if args.nfa:
+                nfa.print_graphviz(args.nfa)
+            dfa = nfa.reduced().to_dfa(bitsets=True, compact=True)
+
+        if args.dfa:
+            dfa.print_graphviz(args.dfa)
+
+        min_dfa = dfa.minimized()
+        if cache:
+            cache.put(key, min_dfa)
 
-    min_dfa = dfa.minimized()
     if args.min_dfa:
         min_dfa.print_graphviz(args.min_dfa)
+    if args.binary_dfa:
+        save_dfa(min_dfa, args.binary_dfa)
 
-    scangen = TableDrivenScannerGenerator(min_dfa)
+    if args.generator == 'direct':
+        scangen = DirectCodedScannerGenerator(min_dfa, args.computed_goto)
+    else:
+        scangen = TableDrivenScannerGenerator(min_dfa, args.compress)
     args.c_source.write(scangen.c_source())
+    if args.c_header:
+        args.c_header.write(scangen.c_header())
 
     rescanner.close()
 
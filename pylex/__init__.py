@@ -1,5 +1,7 @@
 """Python scanner generator."""
 
+__version__ = '0.1'
+
 # Maximum character.
 NUM_SYMBOLS = 0x100
 
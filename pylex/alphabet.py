@@ -0,0 +1,151 @@
+"""Partitioning of the input alphabet into symbol equivalence classes."""
+
+from pylex import NUM_SYMBOLS, SIGMA
+
+
+class Alphabet:
+    """A partition of SIGMA into equivalence classes.
+
+    Two symbols are in the same class if every set of symbols that the regular
+    expressions can match at a single position either contains both of them or
+    neither of them. Symbols in the same class are interchangeable, so finite
+    automata only need one transition per class rather than one per symbol.
+
+    Attributes:
+    num_classes -- The number of equivalence classes.
+    class_of -- A list mapping the ordinal of each symbol to its class ID.
+    classes -- A list mapping each class ID to a string of the symbols in the
+    class, in ascending order.
+
+    """
+
+    def __init__(self, symbol_sets=()):
+        """Create the coarsest partition of SIGMA which respects the given sets.
+
+        Class IDs are assigned in order of the smallest symbol in each class,
+        so the partition does not depend on the order of the sets.
+
+        Arguments:
+        symbol_sets -- An iterable of collections of symbols.
+
+        >>> alphabet = Alphabet([{'a', 'b', 'c'}, {'b'}])
+        >>> alphabet.num_classes
+        3
+        >>> alphabet.classes[alphabet.class_of[ord('a')]]
+        'ac'
+        >>> alphabet.class_of[ord('x')] == alphabet.class_of[ord('\\0')]
+        True
+        """
+
+        class_of = [0] * NUM_SYMBOLS
+        class_sizes = [NUM_SYMBOLS]
+
+        for symbols in set(frozenset(s) for s in symbol_sets):
+            # Group the symbols in this set by the class they are currently in.
+            touched = {}
+            for symbol in symbols:
+                touched.setdefault(class_of[ord(symbol)], []).append(symbol)
+
+            # Split every class which is only partially covered by the set.
+            for old_class, moved in touched.items():
+                if len(moved) < class_sizes[old_class]:
+                    new_class = len(class_sizes)
+                    class_sizes.append(len(moved))
+                    class_sizes[old_class] -= len(moved)
+                    for symbol in moved:
+                        class_of[ord(symbol)] = new_class
+
+        # Renumber the classes in a canonical order.
+        renumber = {}
+        for c in class_of:
+            renumber.setdefault(c, len(renumber))
+
+        self.num_classes = len(renumber)
+        self.class_of = [renumber[c] for c in class_of]
+        self.classes = [''] * self.num_classes
+        for symbol in SIGMA:
+            self.classes[self.class_of[ord(symbol)]] += symbol
+
+    def representative(self, class_id):
+        """Return a symbol which is a member of the given class."""
+
+        return self.classes[class_id][0]
+
+    def classes_in(self, bitmap):
+        """Return a list of the IDs of the classes whose symbols are in the
+        given bitmap of symbols (see symbols_to_bitmap).
+
+        The bitmap should be a union of classes, like any set of symbols that
+        the alphabet was created from.
+
+        >>> alphabet = Alphabet([{'a', 'b'}, {'c'}])
+        >>> alphabet.classes_in(symbols_to_bitmap('abc')) == [
+        ...     alphabet.class_of[ord('a')], alphabet.class_of[ord('c')]]
+        True
+        """
+
+        return [class_id for class_id in range(self.num_classes)
+                if bitmap >> ord(self.classes[class_id][0]) & 1]
+
+    def label(self, class_id):
+        """Return a human-readable description of the given class.
+
+        >>> alphabet = Alphabet([{'a'}, 'xyz'])
+        >>> alphabet.label(alphabet.class_of[ord('a')])
+        "'a'"
+        >>> alphabet.label(alphabet.class_of[ord('y')])
+        "['x'-'z']"
+        """
+
+        return symbols_label(self.classes[class_id])
+
+
+def symbols_to_bitmap(symbols):
+    """Return the bitmap of a collection of symbols: an integer with bit i set
+    if and only if chr(i) is in the collection.
+
+    >>> symbols_to_bitmap('ac') == 1 << ord('a') | 1 << ord('c')
+    True
+    """
+
+    bitmap = 0
+    for symbol in symbols:
+        bitmap |= 1 << ord(symbol)
+    return bitmap
+
+
+def bitmap_to_symbols(bitmap):
+    """Return a string of the symbols in a bitmap, in ascending order.
+
+    >>> bitmap_to_symbols(symbols_to_bitmap('ca'))
+    'ac'
+    """
+
+    return ''.join(symbol for symbol in SIGMA if bitmap >> ord(symbol) & 1)
+
+
+def symbols_label(symbols):
+    """Return a human-readable description of a non-empty string of symbols in
+    ascending order.
+
+    >>> symbols_label('a')
+    "'a'"
+    >>> symbols_label('abcx')
+    "['a'-'c' 'x']"
+    """
+
+    if len(symbols) == 1:
+        return repr(symbols)
+
+    ranges = []
+    start = prev = symbols[0]
+    for symbol in symbols[1:] + '\0':
+        if ord(symbol) != ord(prev) + 1:
+            if start == prev:
+                ranges.append(repr(start))
+            else:
+                ranges.append('{}-{}'.format(repr(start), repr(prev)))
+            start = symbol
+        prev = symbol
+
+    return '[{}]'.format(' '.join(ranges))
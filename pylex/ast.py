@@ -1,5 +1,6 @@
 """Abstract syntax tree class."""
 
+from pylex.alphabet import Alphabet, bitmap_to_symbols
 from pylex.nfa import NFA, NFAState
 
 
@@ -16,7 +17,62 @@ class AST:
 
         (initial, accepting) = self._thompson()
         accepting.accepting = accepting_id
-        return NFA(initial)
+        return NFA(initial, Alphabet(self._symbol_sets()))
+
+    def _children(self):
+        """Return a tuple of the child AST nodes of this node."""
+
+        return ()
+
+    def _postorder(self):
+        """Generate this AST and all of its descendants in postorder.
+
+        The traversal uses an explicit stack, so it works for ASTs of any
+        depth.
+
+        """
+
+        stack = [(self, False)]
+        while stack:
+            (ast, expanded) = stack.pop()
+            if expanded:
+                yield ast
+            else:
+                stack.append((ast, True))
+                stack.extend((child, False) for child in reversed(ast._children()))
+
+    def _symbol_sets(self):
+        """Generate the sets of symbols which this AST can match at a single
+        position.
+
+        These determine the equivalence classes of the alphabet.
+
+        """
+
+        stack = [self]
+        while stack:
+            ast = stack.pop()
+            symbols = ast._symbol_set()
+            if symbols is None:
+                stack.extend(ast._children())
+            else:
+                yield symbols
+
+    def _symbol_set(self):
+        """If this AST matches exactly one symbol from a set of symbols, return
+        that set; otherwise, return None.
+
+        """
+
+        return None
+
+    def _literal(self):
+        """If this AST matches exactly one string, return that string;
+        otherwise, return None.
+
+        """
+
+        return None
 
     def _thompson(self):
         """
@@ -27,6 +83,75 @@ class AST:
 
         """
 
+        fragments = []
+        for ast in self._postorder():
+            num_children = len(ast._children())
+            if num_children:
+                operands = fragments[-num_children:]
+                del fragments[-num_children:]
+            else:
+                operands = []
+            fragments.append(ast._thompson_fragment(operands))
+        return fragments.pop()
+
+    def _thompson_fragment(self, operands):
+        """Build the NFA fragment for this node.
+
+        Arguments:
+        operands -- A list of the NFA fragments of the children of this node,
+        as returned by _children.
+
+        """
+
+        raise NotImplementedError
+
+    def _followpos_fragment(self, operands, follow):
+        """Compute the position sets of this node for the followpos
+        construction.
+
+        Position sets are bitsets of position numbers. Nodes which match a
+        single symbol from a set (see _symbol_set) are positions themselves,
+        so this is only called for the other nodes.
+
+        Arguments:
+        operands -- A list of the (nullable, firstpos, lastpos) tuples of the
+        children of this node, as returned by _children.
+        follow -- A function follow(positions, targets) which adds the
+        positions in targets to the followpos of every position in positions.
+
+        Returns:
+        A (nullable, firstpos, lastpos) tuple for this node.
+
+        """
+
+        raise NotImplementedError
+
+    def _derivative_term(self, operands, terms):
+        """Build the term for this node for Brzozowski's construction.
+
+        Nodes which match a single symbol from a set (see _symbol_set) are
+        converted directly, so this is only called for the other nodes.
+
+        Arguments:
+        operands -- A list of the term IDs of the children of this node, as
+        returned by _children.
+        terms -- The Derivatives instance whose constructors build the terms.
+
+        """
+
+        raise NotImplementedError
+
+    def _simplified(self, operands, simplifier):
+        """Build the simplified version of this node.
+
+        Arguments:
+        operands -- A list of the simplified versions of the children of this
+        node, as returned by _children.
+        simplifier -- The Simplifier instance whose constructors build the
+        nodes.
+
+        """
+
         raise NotImplementedError
 
 
@@ -49,16 +174,62 @@ class SymbolAST(AST):
         super().__init__()
         self.symbol = symbol
 
-    def _thompson(self):
+    def _symbol_set(self):
+        return {self.symbol}
+
+    def _literal(self):
+        return self.symbol
+
+    def _thompson_fragment(self, operands):
         initial = NFAState()
         accepting = NFAState()
         initial.add_transition(self.symbol, accepting)
         return (initial, accepting)
 
+    def _simplified(self, operands, simplifier):
+        return simplifier.symbol(self.symbol)
+
     def __repr__(self):
         return 'SymbolAST({})'.format(repr(self.symbol))
 
 
+class CharClassAST(AST):
+    """AST leaf node: character class, matching any one of a set of symbols.
+
+    Attributes:
+    char_class -- A bitmap of the symbols matched by this node (see
+    pylex.alphabet.symbols_to_bitmap).
+
+    """
+
+    def __init__(self, char_class):
+        """Create a new character class AST node.
+
+        Arguments:
+        char_class -- A non-empty bitmap of symbols.
+
+        """
+
+        super().__init__()
+        self.char_class = char_class
+
+    def _symbol_set(self):
+        return set(bitmap_to_symbols(self.char_class))
+
+    def _thompson_fragment(self, operands):
+        # A single transition on all of the symbols.
+        initial = NFAState()
+        accepting = NFAState()
+        initial.add_transition(self.char_class, accepting)
+        return (initial, accepting)
+
+    def _simplified(self, operands, simplifier):
+        return simplifier.char_class(self.char_class)
+
+    def __repr__(self):
+        return 'CharClassAST({:#x})'.format(self.char_class)
+
+
 class KleeneAST(AST):
     """AST node for the Kleene star operator.
 
@@ -78,14 +249,37 @@ class KleeneAST(AST):
         super().__init__()
         self.operand = operand
 
-    def _thompson(self):
-        (initial, accepting) = self.operand._thompson()
+    def _children(self):
+        return (self.operand,)
+
+    def _thompson_fragment(self, operands):
+        [(operand_initial, operand_accepting)] = operands
 
+        # The closure needs fresh states: adding the loop and the skip to the
+        # operand's own states would let them combine with the transitions of
+        # an enclosing closure and match strings outside of the language.
+        initial = NFAState()
+        accepting = NFAState()
+        initial.add_transition(None, operand_initial)
         initial.add_transition(None, accepting)
-        accepting.add_transition(None, initial)
+        operand_accepting.add_transition(None, operand_initial)
+        operand_accepting.add_transition(None, accepting)
 
         return (initial, accepting)
 
+    def _followpos_fragment(self, operands, follow):
+        [(nullable, first, last)] = operands
+        follow(last, first)
+        return (True, first, last)
+
+    def _derivative_term(self, operands, terms):
+        [operand] = operands
+        return terms.closure(operand)
+
+    def _simplified(self, operands, simplifier):
+        [operand] = operands
+        return simplifier.kleene(operand)
+
     def __repr__(self):
         return 'KleeneAST({})'.format(repr(self.operand))
 
@@ -109,13 +303,34 @@ class PositiveAST(AST):
         super().__init__()
         self.operand = operand
 
-    def _thompson(self):
-        (initial, accepting) = self.operand._thompson()
+    def _children(self):
+        return (self.operand,)
+
+    def _thompson_fragment(self, operands):
+        [(operand_initial, operand_accepting)] = operands
 
-        accepting.add_transition(None, initial)
+        # Like the Kleene closure, but without the skip.
+        initial = NFAState()
+        accepting = NFAState()
+        initial.add_transition(None, operand_initial)
+        operand_accepting.add_transition(None, operand_initial)
+        operand_accepting.add_transition(None, accepting)
 
         return (initial, accepting)
 
+    def _followpos_fragment(self, operands, follow):
+        [(nullable, first, last)] = operands
+        follow(last, first)
+        return (nullable, first, last)
+
+    def _derivative_term(self, operands, terms):
+        [operand] = operands
+        return terms.concatenation(operand, terms.closure(operand))
+
+    def _simplified(self, operands, simplifier):
+        [operand] = operands
+        return simplifier.positive(operand)
+
     def __repr__(self):
         return 'PositiveAST({})'.format(repr(self.operand))
 
@@ -141,24 +356,51 @@ class AlternationAST(AST):
         if len(operands) < 2:
             raise ValueError('must alternate two or more operands')
 
-        self.operands = ()
+        # Flatten nested nodes of the same kind into a single list so that
+        # building a node with many operands takes linear time.
+        flattened = []
         for ast in operands:
             if isinstance(ast, AlternationAST):
-                self.operands += ast.operands
+                flattened.extend(ast.operands)
             else:
-                self.operands += (ast,)
+                flattened.append(ast)
+        self.operands = tuple(flattened)
 
-    def _thompson(self):
+    def _children(self):
+        return self.operands
+
+    def _symbol_set(self):
+        # An alternation of symbols (e.g., a character class) matches a set of
+        # symbols at a single position.
+        if all(isinstance(ast, SymbolAST) for ast in self.operands):
+            return {ast.symbol for ast in self.operands}
+        else:
+            return None
+
+    def _thompson_fragment(self, operands):
         initial = NFAState()
         accepting = NFAState()
 
-        for ast in self.operands:
-            (alternate_initial, alternate_accepting) = ast._thompson()
+        for (alternate_initial, alternate_accepting) in operands:
             initial.add_transition(None, alternate_initial)
             alternate_accepting.add_transition(None, accepting)
 
         return (initial, accepting)
 
+    def _followpos_fragment(self, operands, follow):
+        (nullable, first, last) = (False, 0, 0)
+        for (operand_nullable, operand_first, operand_last) in operands:
+            nullable = nullable or operand_nullable
+            first |= operand_first
+            last |= operand_last
+        return (nullable, first, last)
+
+    def _derivative_term(self, operands, terms):
+        return terms.alternation(operands)
+
+    def _simplified(self, operands, simplifier):
+        return simplifier.alternation(operands)
+
     def __repr__(self):
         return 'AlternationAST({})'.format(', '.join(repr(o) for o in self.operands))
 
@@ -184,23 +426,56 @@ class ConcatenationAST(AST):
         if len(operands) < 2:
             raise ValueError('must concatenate two or more operands')
 
-        self.operands = ()
+        # Flatten nested nodes of the same kind into a single list so that
+        # building a node with many operands takes linear time.
+        flattened = []
         for ast in operands:
             if isinstance(ast, ConcatenationAST):
-                self.operands += ast.operands
+                flattened.extend(ast.operands)
             else:
-                self.operands += (ast,)
+                flattened.append(ast)
+        self.operands = tuple(flattened)
 
-    def _thompson(self):
-        (initial, accepting) = self.operands[0]._thompson()
+    def _children(self):
+        return self.operands
 
-        for i in range(1, len(self.operands)):
-            (next_initial, next_accepting) = self.operands[i]._thompson()
+    def _literal(self):
+        literals = [ast._literal() for ast in self.operands]
+        if None in literals:
+            return None
+        return ''.join(literals)
+
+    def _thompson_fragment(self, operands):
+        (initial, accepting) = operands[0]
+
+        for (next_initial, next_accepting) in operands[1:]:
             accepting.add_transition(None, next_initial)
             accepting = next_accepting
 
         return (initial, accepting)
 
+    def _followpos_fragment(self, operands, follow):
+        (nullable, first, last) = operands[0]
+        for (next_nullable, next_first, next_last) in operands[1:]:
+            follow(last, next_first)
+            if nullable:
+                first |= next_first
+            if next_nullable:
+                last |= next_last
+            else:
+                last = next_last
+            nullable = nullable and next_nullable
+        return (nullable, first, last)
+
+    def _derivative_term(self, operands, terms):
+        term = operands[-1]
+        for operand in reversed(operands[:-1]):
+            term = terms.concatenation(operand, term)
+        return term
+
+    def _simplified(self, operands, simplifier):
+        return simplifier.concatenation(operands)
+
     def __repr__(self):
         return 'ConcatenationAST({})'.format(', '.join(repr(o) for o in self.operands))
 
@@ -211,7 +486,8 @@ def asts_to_nfa(asts):
     Thompson's construction is applied to each AST and an initial state is
     created with epsilon transitions to the initial transitions of each
     constructed NFA. The accepting states are given unique IDs ascending from 1
-    in the original order of the list.
+    in the original order of the list. The alphabet of the NFA is partitioned
+    into the equivalence classes induced by all of the ASTs.
 
     """
 
@@ -222,4 +498,10 @@ def asts_to_nfa(asts):
         aaccepting.accepting = i
         initial.add_transition(None, ainitial)
 
-    return NFA(initial)
+    return NFA(initial, asts_to_alphabet(asts))
+
+
+def asts_to_alphabet(asts):
+    """Return the Alphabet induced by the symbols used in a list of ASTs."""
+
+    return Alphabet(s for ast in asts for s in ast._symbol_sets())
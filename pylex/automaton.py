@@ -11,6 +11,7 @@ class Automaton:
 
     Attributes:
     initial -- The initial state of this automaton.
+    states -- A list of the states in this automaton indexed by number.
     num_states -- The number of states in this automaton.
 
     """
@@ -24,11 +25,16 @@ class Automaton:
         """
 
         self.initial = initial
+        self.states = []
         self.num_states = self._number_states(self.initial, 0)
 
     def _number_states(self, state, next_number):
         """Number the given state and all states reachable from it.
 
+        States are numbered in depth-first preorder, following the transitions
+        of each state in the order returned by _all_transitions. The traversal
+        uses an explicit stack, so it works for automata of any size.
+
         Arguments:
         state -- The state to start with. If it does not already have a number,
         it will be assigned next_number.
@@ -39,24 +45,43 @@ class Automaton:
 
         """
 
-        if state.number is None:
-            state.number = next_number
-            next_number += 1
-            for (symbol, target) in state._all_transitions():
-                next_number = self._number_states(target, next_number)
+        if state.number is not None:
+            return next_number
+
+        state.number = next_number
+        self.states.append(state)
+        next_number += 1
+
+        stack = [iter(state._all_transitions())]
+        while stack:
+            for (symbol, target) in stack[-1]:
+                if target.number is None:
+                    target.number = next_number
+                    self.states.append(target)
+                    next_number += 1
+                    stack.append(iter(target._all_transitions()))
+                    break
+            else:
+                stack.pop()
+
         return next_number
 
     def print_graphviz(self, file=sys.stdout):
         """Print automaton for Graphviz dot rendering."""
 
-        print('digraph {} {{'.format(type(self).__name__), file=file)
-        print('    rankdir = LR;', file=file)
-        print('    I [style = invis];', file=file)
+        states = ((state.number, state.accepting,
+                   [(self._symbol_label(symbol), target.number)
+                    for (symbol, target) in state._all_transitions()])
+                  for state in self.states)
+        _print_graphviz(file, type(self).__name__, self.initial.number, states)
 
-        print('    I -> S{};'.format(self.initial.number), file=file)
-        self.initial._print_graphviz(file, set())
+    def _symbol_label(self, symbol):
+        """Return the Graphviz label for a transition on the given symbol."""
 
-        print('}', file=file)
+        if symbol is None:
+            return '\u03b5'  # Lower case epsilon
+        else:
+            return repr(symbol)
 
 
 class AutomatonState:
@@ -82,7 +107,10 @@ class AutomatonState:
         self.number = None
 
     def _all_transitions(self):
-        """Return a flat set of all transitions from this set."""
+        """Return a flat list of all (symbol, target) transitions from this
+        state in a deterministic order.
+
+        """
 
         raise NotImplementedError
 
@@ -101,28 +129,40 @@ class AutomatonState:
 
         raise NotImplementedError
 
-    def _print_graphviz(self, file, seen):
-        if self in seen:
-            return
-        seen.add(self)
 
-        if self.accepting:
-            subscript = '{},{}'.format(self.number, self.accepting)
+def _print_graphviz(file, name, initial, states):
+    """Print a finite automaton for Graphviz dot rendering.
+
+    Arguments:
+    file -- The file to print to.
+    name -- The name of the graph.
+    initial -- The number of the initial state.
+    states -- An iterable of (number, accepting, transitions) tuples for each
+    state, where transitions is a list of (label, target number) tuples.
+
+    """
+
+    print('digraph {} {{'.format(name), file=file)
+    print('    rankdir = LR;', file=file)
+    print('    I [style = invis];', file=file)
+
+    print('    I -> S{};'.format(initial), file=file)
+    for (number, accepting, transitions) in states:
+        if accepting:
+            subscript = '{},{}'.format(number, accepting)
         else:
-            subscript = self.number
+            subscript = number
 
-        print('    S{} [label = <s<sub>{}</sub>>, shape = circle'.format(self.number, subscript),
+        print('    S{} [label = <s<sub>{}</sub>>, shape = circle'.format(number, subscript),
               file=file, end='')
 
-        if self.accepting:
+        if accepting:
             print(', peripheries = 2', file=file, end='')
         print('];', file=file)
 
-        for (symbol, target) in self._all_transitions():
-            target._print_graphviz(file, seen)
-            if symbol is None:
-                label = '\u03b5'  # Lower case epsilon
-            else:
-                label = repr(symbol).replace('\\', '\\\\')  # Escape slashes
-            print('    S{} -> S{} [label = "{}"];'.format(self.number, target.number, label),
-                  file=file)
+        for (label, target) in transitions:
+            # Escape slashes and quotes
+            label = label.replace('\\', '\\\\').replace('"', '\\"')
+            print('    S{} -> S{} [label = "{}"];'.format(number, target, label), file=file)
+
+    print('}', file=file)
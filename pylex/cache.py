@@ -0,0 +1,178 @@
+"""On-disk cache of compiled DFAs."""
+
+import hashlib
+import os
+import tempfile
+
+import pylex
+from pylex.dfafile import load_dfa, save_dfa
+from pylex.product import ProductConstruction
+
+
+class DFACache:
+    """A content-addressed cache of minimized DFAs stored in a directory.
+
+    Each entry is a file named by the key of the rules it was compiled from.
+    Reading an entry marks it as recently used by updating its modification
+    time, and once the entries exceed the size bound, the least recently used
+    ones are evicted.
+
+    """
+
+    def __init__(self, directory, max_size=64 << 20):
+        """Create a cache in the given directory, creating it if necessary.
+
+        Arguments:
+        directory -- The path of the cache directory.
+        max_size -- The maximum total size of the entries in bytes.
+
+        """
+
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(asts, options=()):
+        """Return the cache key for a list of regular expression ASTs.
+
+        The key depends on the structure of the ASTs rather than on the text
+        of the regular expressions, the version of pylex, and the given
+        options, so it changes whenever the compiled DFA could.
+
+        Arguments:
+        asts -- The list of ASTs, one per rule.
+        options -- An iterable of (name, value) pairs for any options which
+        affect the compiled DFA.
+
+        """
+
+        h = hashlib.sha256()
+        h.update('pylex {}\n'.format(pylex.__version__).encode())
+        for (name, value) in sorted(options):
+            h.update('{}={!r}\n'.format(name, value).encode())
+
+        for ast in asts:
+            # Encode each AST in postfix order: a leaf by its repr and an
+            # inner node by its type and number of children.
+            for node in ast._postorder():
+                children = node._children()
+                if children:
+                    h.update('{}/{}\n'.format(type(node).__name__, len(children)).encode())
+                else:
+                    h.update('{!r}\n'.format(node).encode())
+            h.update(b';\n')
+
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.dfa')
+
+    def get(self, key):
+        """Return the CompactDFA stored under the given key, or None if there
+        is no usable entry.
+
+        """
+
+        path = self._path(key)
+        try:
+            # The entry is read rather than mapped so that it can be evicted
+            # while the DFA is in use.
+            with open(path, 'rb') as f:
+                dfa = load_dfa(f.read())
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used. Failing to (e.g., because the
+        # directory is read-only or the entry was just evicted) doesn't make
+        # the DFA any less usable.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return dfa
+
+    def put(self, key, dfa):
+        """Store a DFA or CompactDFA under the given key."""
+
+        # Write to a temporary file and rename it so that concurrent readers
+        # never see a partial entry.
+        (fd, temp) = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                save_dfa(dfa, f)
+            os.replace(temp, self._path(key))
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits within
+        its size bound.
+
+        """
+
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.dfa'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for (mtime, size, path) in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def compile_rules(asts, cache=None, construct=None):
+    """Compile a list of rules to a minimized DFA one rule at a time.
+
+    Each rule is compiled to its own minimized DFA, which is looked up in and
+    stored to the given cache, and the DFAs are then combined with the product
+    construction. When only a few rules have changed since the last
+    compilation, only those rules go through the subset construction and
+    minimization again.
+
+    Arguments:
+    asts -- The list of ASTs, one per rule.
+    cache -- An optional DFACache.
+    construct -- A function which converts a list of ASTs to a DFA or
+    CompactDFA. Defaults to Thompson's construction followed by NFA reduction
+    and the subset construction.
+
+    Returns:
+    A minimized CompactDFA equivalent to the one compiled from asts_to_nfa.
+
+    """
+
+    dfas = []
+    for ast in asts:
+        # A rule on its own compiles to the same DFA as a single rule file,
+        # so the entries are shared.
+        dfa = None
+        if cache:
+            key = cache.key([ast])
+            dfa = cache.get(key)
+        if dfa is None:
+            if construct:
+                dfa = construct([ast]).minimized()
+            else:
+                dfa = ast.to_nfa().reduced().to_dfa(bitsets=True, compact=True).minimized()
+            if cache:
+                cache.put(key, dfa)
+        dfas.append(dfa)
+
+    return ProductConstruction(dfas)().minimized()
@@ -0,0 +1,260 @@
+"""Implementation of Brzozowski's derivative construction of DFAs."""
+
+from array import array
+
+from pylex.ast import asts_to_alphabet
+from pylex.dfa import CompactDFA
+
+# Term kinds.
+_EMPTY = 0
+_EPSILON = 1
+_SET = 2
+_CONCATENATION = 3
+_ALTERNATION = 4
+_CLOSURE = 5
+
+
+class Derivatives:
+    """Brzozowski's construction: convert a list of ASTs to a DFA by repeatedly
+    taking the derivatives of the regular expressions.
+
+    The derivative of a regular expression r with respect to a symbol c
+    matches exactly the strings s for which r matches cs, so the regular
+    expressions reached by taking derivatives are the states of a DFA. A
+    state accepts if its regular expression matches the empty string. With
+    several rules, a state is the tuple of the derivatives of the rules which
+    can still match, and it accepts the first rule which matches the empty
+    string.
+
+    Regular expressions are represented as hash-consed terms: every distinct
+    term is created once and referred to by an integer ID, so terms can be
+    compared and hashed in constant time. The constructors normalize the
+    terms so that the derivatives of equivalent expressions usually get the
+    same ID:
+
+    * Alternation is associative, commutative and idempotent, has the empty
+      language as its identity, and merges alternatives which are sets of
+      symbols into a single set.
+    * Concatenation has the empty string as its identity and the empty
+      language as its zero.
+    * (r*)* is r*, and the closure of the empty string or the empty language
+      is the empty string.
+
+    This makes the number of distinct derivatives finite, and the resulting
+    DFA is often close to minimal.
+
+    """
+
+    def __init__(self, asts):
+        """Create a DFA constructor for the given list of ASTs, one per rule in
+        priority order.
+
+        """
+
+        self.asts = asts
+        self.alphabet = asts_to_alphabet(asts)
+
+        # Each term is a (kind, operands) tuple: a class bitset for sets, a
+        # pair of term IDs for concatenations, a frozenset of term IDs for
+        # alternations, and a term ID for closures.
+        self._terms = []
+        self._nullable = []
+        self._ids = {}
+        self._derivatives = {}
+        self.empty = self._term(_EMPTY, None, False)
+        self.epsilon = self._term(_EPSILON, None, True)
+
+    def __call__(self):
+        rules = [self._from_ast(ast) for ast in self.asts]
+
+        num_classes = self.alphabet.num_classes
+        accepting = array('i')
+        transitions = array('i')
+        numbers = {}
+        worklist = []
+
+        def number(q):
+            try:
+                return numbers[q]
+            except KeyError:
+                numbers[q] = len(accepting)
+                accepting.append(next((i + 1 for (i, r) in q if self._nullable[r]), 0))
+                transitions.extend(array('i', [-1]) * num_classes)
+                worklist.append(q)
+                return numbers[q]
+
+        number(tuple((i, r) for (i, r) in enumerate(rules) if r != self.empty))
+        while worklist:
+            q = worklist.pop()
+            row = numbers[q] * num_classes
+            for class_id in range(num_classes):
+                t = []
+                for (i, r) in q:
+                    d = self.derivative(r, class_id)
+                    if d != self.empty:
+                        t.append((i, d))
+                if t:
+                    transitions[row + class_id] = number(tuple(t))
+
+        return CompactDFA(self.alphabet, accepting, transitions)
+
+    def _term(self, kind, operands, nullable):
+        """Return the ID of a term, creating it if necessary."""
+
+        key = (kind, operands)
+        try:
+            return self._ids[key]
+        except KeyError:
+            self._ids[key] = len(self._terms)
+            self._terms.append(key)
+            self._nullable.append(nullable)
+            return self._ids[key]
+
+    def symbols(self, classes):
+        """Return the term matching a single symbol in the classes in the given
+        bitset.
+
+        """
+
+        if not classes:
+            return self.empty
+        return self._term(_SET, classes, False)
+
+    def concatenation(self, a, b):
+        """Return the term for the concatenation of the terms a and b."""
+
+        if a == self.empty or b == self.empty:
+            return self.empty
+        if a == self.epsilon:
+            return b
+        if b == self.epsilon:
+            return a
+        return self._term(_CONCATENATION, (a, b), self._nullable[a] and self._nullable[b])
+
+    def alternation(self, terms):
+        """Return the term for the alternation of an iterable of terms."""
+
+        operands = set()
+        classes = 0
+        for t in terms:
+            (kind, t_operands) = self._terms[t]
+            if kind == _ALTERNATION:
+                members = t_operands
+            else:
+                members = (t,)
+            for m in members:
+                (kind, m_operands) = self._terms[m]
+                if kind == _SET:
+                    classes |= m_operands
+                elif kind != _EMPTY:
+                    operands.add(m)
+        if classes:
+            operands.add(self.symbols(classes))
+
+        if not operands:
+            return self.empty
+        if len(operands) == 1:
+            return operands.pop()
+        operands = frozenset(operands)
+        return self._term(_ALTERNATION, operands,
+                          any(self._nullable[t] for t in operands))
+
+    def closure(self, a):
+        """Return the term for the Kleene closure of the term a."""
+
+        if a == self.empty or a == self.epsilon:
+            return self.epsilon
+        if self._terms[a][0] == _CLOSURE:
+            return a
+        return self._term(_CLOSURE, a, True)
+
+    def derivative(self, r, class_id):
+        """Return the derivative of the term r with respect to a symbol in the
+        given class.
+
+        The derivatives of the subterms are computed in postorder with an
+        explicit stack and memoized.
+
+        """
+
+        derivatives = self._derivatives
+        stack = [r]
+        while stack:
+            t = stack[-1]
+            if (t, class_id) in derivatives:
+                stack.pop()
+                continue
+
+            (kind, operands) = self._terms[t]
+            if kind == _CONCATENATION:
+                (a, b) = operands
+                needed = (a, b) if self._nullable[a] else (a,)
+            elif kind == _ALTERNATION:
+                needed = operands
+            elif kind == _CLOSURE:
+                needed = (operands,)
+            else:
+                needed = ()
+            missing = [x for x in needed if (x, class_id) not in derivatives]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+
+            if kind == _SET:
+                d = self.epsilon if operands >> class_id & 1 else self.empty
+            elif kind == _CONCATENATION:
+                # d(ab) = d(a)b | d(b) if a is nullable
+                d = self.concatenation(derivatives[(a, class_id)], b)
+                if self._nullable[a]:
+                    d = self.alternation((d, derivatives[(b, class_id)]))
+            elif kind == _ALTERNATION:
+                d = self.alternation(derivatives[(x, class_id)] for x in operands)
+            elif kind == _CLOSURE:
+                # d(a*) = d(a)a*
+                d = self.concatenation(derivatives[(operands, class_id)], t)
+            else:
+                d = self.empty
+            derivatives[(t, class_id)] = d
+
+        return derivatives[(r, class_id)]
+
+    def _from_ast(self, ast):
+        """Convert an AST to a term.
+
+        The traversal is in postorder with an explicit stack, so it works for
+        ASTs of any depth.
+
+        """
+
+        class_of = self.alphabet.class_of
+        terms = []
+        stack = [(ast, False)]
+        while stack:
+            (node, expanded) = stack.pop()
+            symbols = None if expanded else node._symbol_set()
+            if symbols is not None:
+                classes = 0
+                for symbol in symbols:
+                    classes |= 1 << class_of[ord(symbol)]
+                terms.append(self.symbols(classes))
+            elif expanded:
+                num_children = len(node._children())
+                operands = terms[-num_children:]
+                del terms[-num_children:]
+                terms.append(node._derivative_term(operands, self))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node._children()))
+        return terms.pop()
+
+
+def asts_to_dfa(asts):
+    """Convert a list of ASTs to a CompactDFA with Brzozowski's construction.
+
+    The accepting states are given IDs ascending from 1 in the original order
+    of the list, as in asts_to_nfa.
+
+    """
+
+    return Derivatives(asts)()
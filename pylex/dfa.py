@@ -1,6 +1,11 @@
-"""Deterministic finite automaton class."""
+"""Deterministic finite automaton classes."""
 
-from pylex.automaton import Automaton, AutomatonState
+from array import array
+import sys
+
+from pylex import SIGMA
+from pylex.alphabet import Alphabet
+from pylex.automaton import Automaton, AutomatonState, _print_graphviz
 
 
 class DFA(Automaton):
@@ -9,22 +14,63 @@ class DFA(Automaton):
     Each state has only a single transition for each symbol and epsilon
     transitions are not allowed.
 
+    Attributes:
+    alphabet -- The Alphabet whose class IDs label the transitions of this DFA.
+
     """
 
-    def __init__(self, initial):
+    def __init__(self, initial, alphabet=None):
+        """Create a new DFA with the given initial state.
+
+        Arguments:
+        initial -- The initial automaton state.
+        alphabet -- The Alphabet whose class IDs are the transition symbols.
+        Defaults to the partition which puts each symbol in its own class, in
+        which case the class ID of a symbol is its ordinal.
+
+        """
+
         super().__init__(initial)
 
+        if alphabet is None:
+            alphabet = Alphabet({symbol} for symbol in SIGMA)
+        self.alphabet = alphabet
+
+    def _symbol_label(self, symbol):
+        return self.alphabet.label(symbol)
+
     def minimized(self):
         """Return a minimized DFA equivalent to this DFA."""
 
         from pylex.hopcroft import Hopcroft
 
-        return Hopcroft(self)()
+        return Hopcroft(self)().to_dfa()
+
+    def to_compact(self):
+        """Return a CompactDFA equivalent to this DFA with the same state
+        numbers.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        accepting = array('i', [0]) * self.num_states
+        transitions = array('i', [-1]) * (self.num_states * num_classes)
+
+        for state in self.states:
+            if state.accepting:
+                accepting[state.number] = state.accepting
+            row = state.number * num_classes
+            for (class_id, target) in state.transitions.items():
+                transitions[row + class_id] = target.number
+
+        return CompactDFA(self.alphabet, accepting, transitions)
 
     def to_scanner(self):
-        """Return a scanner which recognizes the same language as this DFA."""
+        """Return a Scanner which recognizes the same language as this DFA."""
+
+        from pylex.scanner import Scanner
 
-        pass
+        return Scanner(self)
 
 
 class DFAState(AutomatonState):
@@ -32,7 +78,7 @@ class DFAState(AutomatonState):
 
     Attributes:
     transitions -- A set of outgoing transitions from this state represented as
-    a dictionary from characters to another state.
+    a dictionary from symbol class IDs to another state.
 
     """
 
@@ -40,27 +86,27 @@ class DFAState(AutomatonState):
         super().__init__(accepting)
 
     def _all_transitions(self):
-        return set(self.transitions.items())
+        return sorted(self.transitions.items())
 
     def add_transition(self, symbol, to):
         """Add a transition to this state.
 
         Arguments:
-        symbol -- The symbol on which to take the transition; must not already
-        be in the keys of transitions and must not be None.
+        symbol -- The symbol class ID on which to take the transition; must not
+        already be in the keys of transitions and must not be None.
         to -- The state to transition to on the given symbol.
 
         >>> state1 = DFAState()
         >>> state2 = DFAState()
-        >>> state1.add_transition('a', state2)
-        >>> state1.add_transition('b', state1)
+        >>> state1.add_transition(0, state2)
+        >>> state1.add_transition(1, state1)
         >>> len(state1.transitions)
         2
         >>> state1.add_transition(None, state2)
         Traceback (most recent call last):
             ...
         AssertionError: DFA cannot contain epsilon transitions
-        >>> state1.add_transition('a', state2)
+        >>> state1.add_transition(0, state2)
         Traceback (most recent call last):
             ...
         AssertionError: state already contains given transition
@@ -71,3 +117,91 @@ class DFAState(AutomatonState):
         assert symbol is not None, 'DFA cannot contain epsilon transitions'
         assert symbol not in self.transitions, 'state already contains given transition'
         self.transitions[symbol] = to
+
+
+class CompactDFA:
+    """A deterministic finite automaton stored as flat arrays indexed by state
+    number rather than as a graph of DFAState objects.
+
+    State 0 is the initial state.
+
+    Attributes:
+    alphabet -- The Alphabet whose class IDs index the transition table.
+    num_states -- The number of states in this automaton.
+    accepting -- An array mapping each state number to the ID of the rule that
+    the state accepts, or 0 if it is not an accepting state.
+    transitions -- An array of num_states * alphabet.num_classes state
+    numbers. The transition from state s on class c is to state
+    transitions[s * alphabet.num_classes + c], or -1 if there is none.
+
+    """
+
+    def __init__(self, alphabet, accepting, transitions):
+        """Create a new compact DFA from its tables.
+
+        Arguments:
+        alphabet -- The Alphabet of the DFA.
+        accepting -- The accepting array, as described above.
+        transitions -- The transition array, as described above.
+
+        """
+
+        if len(transitions) != len(accepting) * alphabet.num_classes:
+            raise ValueError('transition table does not match alphabet')
+
+        self.alphabet = alphabet
+        self.num_states = len(accepting)
+        self.accepting = accepting
+        self.transitions = transitions
+
+    def row(self, state):
+        """Return the transitions from the given state as a sequence indexed by
+        class ID.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        return self.transitions[state * num_classes:(state + 1) * num_classes]
+
+    def minimized(self):
+        """Return a minimized CompactDFA equivalent to this DFA."""
+
+        from pylex.hopcroft import Hopcroft
+
+        return Hopcroft(self)()
+
+    def to_compact(self):
+        """Return this DFA."""
+
+        return self
+
+    def to_scanner(self):
+        """Return a Scanner which recognizes the same language as this DFA."""
+
+        from pylex.scanner import Scanner
+
+        return Scanner(self)
+
+    def to_dfa(self):
+        """Return an equivalent DFA made of DFAState objects."""
+
+        num_classes = self.alphabet.num_classes
+        states = [DFAState(accepting if accepting else None) for accepting in self.accepting]
+
+        for (number, state) in enumerate(states):
+            row = number * num_classes
+            for class_id in range(num_classes):
+                target = self.transitions[row + class_id]
+                if target >= 0:
+                    state.add_transition(class_id, states[target])
+
+        return DFA(states[0], self.alphabet)
+
+    def print_graphviz(self, file=sys.stdout):
+        """Print automaton for Graphviz dot rendering."""
+
+        states = ((number, self.accepting[number],
+                   [(self.alphabet.label(class_id), target)
+                    for (class_id, target) in enumerate(self.row(number)) if target >= 0])
+                  for number in range(self.num_states))
+        _print_graphviz(file, 'DFA', 0, states)
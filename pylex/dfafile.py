@@ -0,0 +1,130 @@
+"""Binary file format for DFAs.
+
+A DFA file stores the tables of a CompactDFA so that they can be used directly
+from a memory mapping of the file. All integers are little-endian and every
+section is aligned to four bytes:
+
+    magic        8 bytes, b'PYLEXDFA'
+    version      uint32, currently 1
+    flags        uint32; bit 0 is set if the class map is present
+    num_states   uint32
+    num_classes  uint32
+    class map    NUM_SYMBOLS uint8 class IDs, indexed by symbol ordinal;
+                 if absent, every symbol is its own class
+    accepting    num_states int32, as in CompactDFA
+    transitions  num_states * num_classes int32, as in CompactDFA
+
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from pylex import NUM_SYMBOLS, SIGMA
+from pylex.alphabet import Alphabet
+from pylex.dfa import CompactDFA
+
+MAGIC = b'PYLEXDFA'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIII')
+_CLASS_MAP = 1
+
+
+def save_dfa(dfa, file):
+    """Write a DFA to a binary file.
+
+    Arguments:
+    dfa -- The DFA or CompactDFA to write.
+    file -- A file object opened in binary mode.
+
+    """
+
+    dfa = dfa.to_compact()
+    class_of = dfa.alphabet.class_of
+    identity = class_of == list(range(NUM_SYMBOLS))
+
+    file.write(_HEADER.pack(MAGIC, VERSION, 0 if identity else _CLASS_MAP,
+                            dfa.num_states, dfa.alphabet.num_classes))
+    if not identity:
+        file.write(bytes(class_of))
+    for table in (dfa.accepting, dfa.transitions):
+        table = array('i', table)
+        if sys.byteorder != 'little':
+            table.byteswap()
+        file.write(table.tobytes())
+
+
+def load_dfa(source):
+    """Load a DFA from a binary file without copying its tables.
+
+    Arguments:
+    source -- A path to a file, which is memory-mapped, or an object
+    supporting the buffer protocol containing the file.
+
+    Returns:
+    A CompactDFA whose accepting and transition tables are views of the
+    source. On big-endian machines, the tables are copied instead.
+
+    Raises:
+    ValueError -- If the source is not a valid DFA file.
+
+    """
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(source).cast('B')
+
+    if len(buffer) < _HEADER.size:
+        raise ValueError('truncated DFA file')
+    (magic, version, flags, num_states, num_classes) = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('not a DFA file')
+    if version != VERSION:
+        raise ValueError('unsupported DFA file version {}'.format(version))
+
+    offset = _HEADER.size
+    if flags & _CLASS_MAP:
+        class_of = buffer[offset:offset + NUM_SYMBOLS]
+        offset += NUM_SYMBOLS
+        classes = {}
+        for (symbol, class_id) in zip(SIGMA, class_of):
+            classes.setdefault(class_id, []).append(symbol)
+        alphabet = Alphabet(classes.values())
+        if alphabet.class_of != list(class_of):
+            raise ValueError('invalid class map')
+    else:
+        alphabet = Alphabet({symbol} for symbol in SIGMA)
+    if alphabet.num_classes != num_classes:
+        raise ValueError('class map does not match number of classes')
+
+    size = 4 * (num_states + num_states * num_classes)
+    if len(buffer) != offset + size:
+        raise ValueError('DFA file has wrong size')
+
+    accepting = buffer[offset:offset + 4 * num_states]
+    transitions = buffer[offset + 4 * num_states:]
+    if sys.byteorder == 'little':
+        accepting = accepting.cast('i')
+        transitions = transitions.cast('i')
+    else:
+        tables = []
+        for table in (accepting, transitions):
+            tables.append(array('i'))
+            tables[-1].frombytes(table)
+            tables[-1].byteswap()
+        (accepting, transitions) = tables
+
+    # Catch corrupt tables here rather than as out of range lookups while
+    # scanning.
+    if num_states == 0:
+        raise ValueError('DFA file has no states')
+    if min(accepting) < 0:
+        raise ValueError('invalid accepting ID in DFA file')
+    if min(transitions) < -1 or max(transitions) >= num_states:
+        raise ValueError('invalid transition in DFA file')
+
+    return CompactDFA(alphabet, accepting, transitions)
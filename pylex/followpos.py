@@ -0,0 +1,154 @@
+"""Implementation of the followpos construction (a.k.a. position automaton
+construction) of a DFA directly from regular expression ASTs.
+
+"""
+
+from array import array
+
+from pylex.ast import asts_to_alphabet
+from pylex.dfa import CompactDFA
+
+
+class Followpos:
+    """Followpos construction: convert a list of ASTs directly to a DFA
+    without building an NFA.
+
+    Every node which matches a single symbol from a set is a position, and
+    each rule gets an extra end position. Computing nullable, firstpos and
+    lastpos for every node gives followpos for every position: the positions
+    which can match the symbol after the one matched by that position. A DFA
+    state is then a set of positions, like a configuration in the subset
+    construction; the transition on a class goes to the union of the
+    followpos of the member positions which match the class. A state accepts
+    the first rule whose end position it contains.
+
+    Position sets are represented as bitsets.
+
+    """
+
+    def __init__(self, asts):
+        """Create a DFA constructor for the given list of ASTs, one per rule in
+        priority order.
+
+        """
+
+        self.asts = asts
+        self.alphabet = asts_to_alphabet(asts)
+
+        # The class IDs matched by each position; end positions match
+        # nothing.
+        self.position_classes = []
+        self.followpos = []
+
+    def __call__(self):
+        initial = 0
+        # The end positions of the rules are numbered in ascending order, so
+        # the lowest end position in a state is the one of the first rule.
+        ends = 0
+        end_rules = {}
+        for (i, ast) in enumerate(self.asts, 1):
+            (nullable, first, last) = self._positions(ast)
+            end = 1 << self._new_position(())
+            self._follow(last, end)
+            initial |= first
+            if nullable:
+                initial |= end
+            ends |= end
+            end_rules[end] = i
+
+        num_classes = self.alphabet.num_classes
+        accepting = array('i')
+        transitions = array('i')
+        numbers = {}
+        worklist = []
+
+        def number(q):
+            try:
+                return numbers[q]
+            except KeyError:
+                numbers[q] = len(accepting)
+                q_ends = q & ends
+                accepting.append(end_rules[q_ends & -q_ends] if q_ends else 0)
+                transitions.extend(array('i', [-1]) * num_classes)
+                worklist.append(q)
+                return numbers[q]
+
+        number(initial)
+        while worklist:
+            q = worklist.pop()
+            row = numbers[q] * num_classes
+
+            q_moves = {}
+            members = q
+            while members:
+                low = members & -members
+                p = low.bit_length() - 1
+                members ^= low
+                for class_id in self.position_classes[p]:
+                    q_moves[class_id] = q_moves.get(class_id, 0) | self.followpos[p]
+
+            for class_id in sorted(q_moves):
+                if q_moves[class_id]:
+                    transitions[row + class_id] = number(q_moves[class_id])
+
+        return CompactDFA(self.alphabet, accepting, transitions)
+
+    def _new_position(self, symbols):
+        """Create a position matching the given symbols and return its
+        number.
+
+        """
+
+        class_of = self.alphabet.class_of
+        self.position_classes.append(sorted({class_of[ord(symbol)] for symbol in symbols}))
+        self.followpos.append(0)
+        return len(self.followpos) - 1
+
+    def _follow(self, positions, targets):
+        """Add targets to the followpos of every position in positions."""
+
+        followpos = self.followpos
+        while positions:
+            low = positions & -positions
+            positions ^= low
+            followpos[low.bit_length() - 1] |= targets
+
+    def _positions(self, ast):
+        """Create the positions of an AST and compute its followpos.
+
+        The traversal is in postorder with an explicit stack, so it works for
+        ASTs of any depth.
+
+        Returns:
+        The (nullable, firstpos, lastpos) tuple of the AST.
+
+        """
+
+        fragments = []
+        stack = [(ast, False)]
+        while stack:
+            (node, expanded) = stack.pop()
+            symbols = None if expanded else node._symbol_set()
+            if symbols is not None:
+                position = 1 << self._new_position(symbols)
+                fragments.append((False, position, position))
+            elif expanded:
+                num_children = len(node._children())
+                operands = fragments[-num_children:]
+                del fragments[-num_children:]
+                fragments.append(node._followpos_fragment(operands, self._follow))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node._children()))
+        return fragments.pop()
+
+
+def asts_to_dfa(asts):
+    """Convert a list of ASTs to a CompactDFA with the followpos construction.
+
+    The accepting states are given IDs ascending from 1 in the original order
+    of the list, as in asts_to_nfa.
+
+    """
+
+    return Followpos(asts)()
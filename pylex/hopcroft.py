@@ -1,101 +1,175 @@
 """Implementation of Hopcroft's algorithm."""
 
-from pylex import SIGMA
-from pylex.dfa import DFA, DFAState
+from array import array
+
+from pylex.dfa import CompactDFA
 
 
 class Hopcroft:
-    """Hopcroft's algorithm: minimize a DFA."""
+    """Hopcroft's algorithm: minimize a DFA.
 
-    def __init__(self, dfa):
-        """Create a DFA minimizer for the given DFA."""
+    The states are partitioned into blocks, starting with one block per
+    accepting ID. A worklist holds (block, symbol class) splitters; processing
+    a splitter separates every block into the states which transition into the
+    splitter block on that class and the states which don't. When a block is
+    split, only the smaller half needs to be added as a new splitter, which
+    makes the algorithm run in O(n log n) time for a fixed alphabet.
 
-        self.initial = dfa.initial
+    Missing transitions are treated as transitions to an implicit dead state,
+    so states which cannot reach an accepting state are removed as well.
 
-    def __call__(self):
-        T = self._initial_partition()
-        self.P = set()
+    The minimizer works on the flat tables of a CompactDFA and returns a
+    CompactDFA.
 
-        # Iterate until a fixed point.
-        while self.P != T:
-            self.P = T
-            T = set()
+    """
 
-            for p in self.P:
-                T |= self._split(p)
+    def __init__(self, dfa):
+        """Create a DFA minimizer for the given DFA or CompactDFA."""
 
-        dfa_states = {}
+        dfa = dfa.to_compact()
+        self.alphabet = dfa.alphabet
+        self.accepting = dfa.accepting
+        self.transitions = dfa.transitions
 
-        def aux(subset):
-            state = next(iter(subset))
-            dfa_state = DFAState(state.accepting)
-            dfa_states[subset] = dfa_state
+    def __call__(self):
+        self._build_inverse()
+        self._initial_partition()
+        self._refine()
+        return self._build_dfa()
 
-            for (symbol, target) in state.transitions.items():
-                target_subset = self._partition_containing(target)
+    def _build_inverse(self):
+        """Compute the inverse transition lists.
 
-                if target_subset not in dfa_states:
-                    aux(target_subset)
-                dfa_state.add_transition(symbol, dfa_states[target_subset])
+        self.inverse[c] maps each state number to the list of numbers of the
+        states which transition to it on class c. The dead state is numbered
+        self.dead, which is the number of states, len(self.accepting).
 
-            return dfa_state
+        """
 
-        initial_subset = self._partition_containing(self.initial)
+        num_classes = self.alphabet.num_classes
+        self.dead = len(self.accepting)
+        self.inverse = [{} for c in range(num_classes)]
 
-        return DFA(aux(initial_subset))
+        for (i, target) in enumerate(self.transitions):
+            (s, c) = divmod(i, num_classes)
+            if target < 0:
+                target = self.dead
+            self.inverse[c].setdefault(target, []).append(s)
 
-    def _initial_partition(self):
-        """Perform an initial partition of all of the states of this DFA based
-        on their accepting behavior.
+        for inverse in self.inverse:
+            inverse.setdefault(self.dead, []).append(self.dead)
 
-        """
+    def _initial_partition(self):
+        """Partition all of the states of this DFA based on their accepting
+        behavior.
 
-        from collections import defaultdict
+        self.blocks is a list of sets of state numbers and self.block_of maps
+        each state number to the index of the block containing it.
 
-        T = defaultdict(lambda: set())
+        """
 
-        def aux(state):
-            T[state.accepting].add(state)
-            for target in state.transitions.values():
-                if target not in set.union(*T.values()):
-                    aux(target)
-        aux(self.initial)
+        blocks = {}
+        for (s, accepting) in enumerate(self.accepting):
+            blocks.setdefault(accepting, set()).add(s)
+        blocks.setdefault(0, set()).add(self.dead)
 
-        return set(frozenset(s) for s in T.values())
+        self.blocks = list(blocks.values())
+        self.block_of = [None] * (self.dead + 1)
+        for (b, block) in enumerate(self.blocks):
+            for s in block:
+                self.block_of[s] = b
 
-    def _split(self, S):
-        """Attempt to split a set of DFA states based on their transitions to
-        other subsets in the partition.
+    def _refine(self):
+        """Split the blocks until every block contains only equivalent
+        states.
 
         """
 
-        def splits(c):
-            for i in S:
-                s1 = set()
-                s2 = set()
-
-                expected = i.transitions.get(c, None)
-                expected = self._partition_containing(expected)
-                for j in S:
-                    actual = j.transitions.get(c, None)
-                    actual = self._partition_containing(actual)
-                    if actual == expected:
-                        s1.add(j)
+        num_classes = self.alphabet.num_classes
+        blocks = self.blocks
+        block_of = self.block_of
+
+        # Every initial block but the largest is a splitter.
+        largest = max(range(len(blocks)), key=lambda b: len(blocks[b]))
+        worklist = [(b, c) for b in range(len(blocks)) if b != largest
+                    for c in range(num_classes)]
+        pending = set(worklist)
+
+        while worklist:
+            splitter = worklist.pop()
+            pending.remove(splitter)
+            (a, c) = splitter
+
+            # Group the predecessors of the splitter by the block they are in.
+            inverse = self.inverse[c]
+            touched = {}
+            for t in blocks[a]:
+                for s in inverse.get(t, ()):
+                    touched.setdefault(block_of[s], []).append(s)
+
+            for (y, moved) in touched.items():
+                if len(moved) == len(blocks[y]):
+                    continue
+
+                z = len(blocks)
+                moved = set(moved)
+                blocks[y] -= moved
+                blocks.append(moved)
+                for s in moved:
+                    block_of[s] = z
+
+                smaller = z if len(blocks[z]) <= len(blocks[y]) else y
+                for d in range(num_classes):
+                    if (y, d) in pending:
+                        new = (z, d)
                     else:
-                        s2.add(j)
+                        new = (smaller, d)
+                    pending.add(new)
+                    worklist.append(new)
 
-                if s1 and s2:
-                    return {frozenset(s1), frozenset(s2)}
+    def _build_dfa(self):
+        """Create the minimized DFA from the final partition.
 
-        for c in SIGMA:
-            split = splits(c)
-            if split:
-                return split
-        else:
-            return {S}
+        The states of the minimized DFA are numbered in the order they are
+        reached from the initial state.
 
-    def _partition_containing(self, state):
-        try:
-            return next(p for p in self.P if state in p)
-        except StopIteration:
-            return None
+        """
+
+        num_classes = self.alphabet.num_classes
+        dead_block = self.block_of[self.dead]
+        initial_block = self.block_of[0]
+
+        accepting = array('i')
+        transitions = array('i')
+        numbers = {}
+        worklist = []
+
+        def number(b):
+            try:
+                return numbers[b]
+            except KeyError:
+                representative = min(self.blocks[b])
+                numbers[b] = len(accepting)
+                accepting.append(self.accepting[representative])
+                transitions.extend(self.transitions[representative * num_classes:
+                                                    (representative + 1) * num_classes])
+                worklist.append(numbers[b])
+                return numbers[b]
+
+        number(initial_block)
+        if initial_block == dead_block:
+            # The DFA doesn't accept anything.
+            transitions = array('i', [-1]) * num_classes
+        else:
+            while worklist:
+                row = worklist.pop() * num_classes
+                for c in range(num_classes):
+                    target = transitions[row + c]
+                    if target >= 0:
+                        target_block = self.block_of[target]
+                        if target_block == dead_block:
+                            transitions[row + c] = -1
+                        else:
+                            transitions[row + c] = number(target_block)
+
+        return CompactDFA(self.alphabet, accepting, transitions)
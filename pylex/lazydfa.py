@@ -0,0 +1,255 @@
+"""Lazy DFA: scanning with DFA states built on demand from an NFA."""
+
+from pylex.rescanner import ScanningError
+from pylex.scanner import _translate
+
+# Transition table entry for a transition which hasn't been computed yet.
+_UNKNOWN = -2
+
+
+class LazyDFA:
+    """A scanner which runs the DFA of an NFA without constructing it ahead of
+    time.
+
+    DFA states are created from NFA configurations the first time the scanner
+    reaches them, and the transitions between them are filled in the first
+    time they are taken. Configurations are represented as bitsets of NFA
+    state numbers like in the bitset mode of RabinScott. On typical input, the
+    scanner quickly stops creating states and runs at the speed of a DFA
+    even when the full DFA would be exponentially large.
+
+    The states are kept in a cache with a bounded size. When the cache is
+    full and a new state is needed, the scanner checks how much input it has
+    scanned since the scan started or the cache was last flushed. If it is at
+    least 10 times max_states symbols, the cache is flushed and the states are
+    built again as they are needed. Otherwise, building the states doesn't pay
+    for itself, so the cache is flushed and the rest of the input is scanned
+    by simulating the NFA directly instead.
+
+    The scanner has the same semantics as Scanner: each token is the longest
+    prefix of the remaining input which the NFA accepts, and its syntactic
+    category is the smallest accepting ID among the NFA states reached.
+
+    Attributes:
+    max_states -- The maximum number of DFA states kept in the cache.
+    flushes -- The number of times the cache has been flushed.
+    simulating -- Whether the previous call to scan fell back to NFA
+    simulation.
+
+    """
+
+    def __init__(self, nfa, max_memory=1 << 22):
+        """Create a lazy DFA for the given NFA.
+
+        Arguments:
+        nfa -- The NFA to scan with.
+        max_memory -- The approximate maximum number of bytes used by the
+        cached DFA states.
+
+        """
+
+        self.alphabet = nfa.alphabet
+        self._translation = bytes(self.alphabet.class_of)
+
+        closures = [0] * nfa.num_states
+        for state in nfa.states:
+            for member in state.epsilon_closure():
+                closures[state.number] |= 1 << member.number
+
+        # For each NFA state, a dictionary from class ID to
+        # EpsilonClosure(Delta(state, class)).
+        self._moves = []
+        for state in nfa.states:
+            moves = {}
+            for (class_id, targets) in state.class_transitions(self.alphabet).items():
+                for target in targets:
+                    moves[class_id] = moves.get(class_id, 0) | closures[target.number]
+            self._moves.append(moves)
+
+        # (accepting ID, bitset of the NFA states with that ID) pairs in
+        # priority order.
+        accepting = {}
+        for state in nfa.states:
+            if state.accepting:
+                accepting[state.accepting] = accepting.get(state.accepting, 0) | 1 << state.number
+        self._accepting_sets = sorted(accepting.items())
+
+        self._initial = closures[nfa.initial.number]
+
+        # Each cached state costs a row of transitions, its configuration, and
+        # bookkeeping.
+        state_size = 8 * self.alphabet.num_classes + nfa.num_states // 8 + 200
+        self.max_states = max(2, max_memory // state_size)
+
+        self._configs = []
+        self._numbers = {}
+        self._accepting = []
+        self._transitions = []
+        self._flush()
+        self.flushes = 0
+        self.simulating = False
+
+    def _flush(self):
+        """Empty the cache except for the initial state."""
+
+        self._configs.clear()
+        self._numbers.clear()
+        self._accepting.clear()
+        self._transitions.clear()
+        self._add_state(self._initial)
+
+    def _add_state(self, config):
+        """Add a state to the cache and return its number."""
+
+        number = len(self._configs)
+        self._configs.append(config)
+        self._numbers[config] = number
+        self._accepting.append(self._config_accepting(config))
+        self._transitions.extend([_UNKNOWN] * self.alphabet.num_classes)
+        return number
+
+    def _config_accepting(self, config):
+        """Return the accepting ID of a configuration, or 0."""
+
+        for (accepting, members) in self._accepting_sets:
+            if config & members:
+                return accepting
+        return 0
+
+    def _move(self, config, class_id):
+        """Return the configuration reached from a configuration on a class."""
+
+        target = 0
+        moves = self._moves
+        while config:
+            low = config & -config
+            config ^= low
+            target |= moves[low.bit_length() - 1].get(class_id, 0)
+        return target
+
+    def scan(self, data):
+        """Generate the tokens in the given input.
+
+        Arguments:
+        data -- A str or bytes-like object. A str may only contain characters
+        in SIGMA.
+
+        Yields:
+        (category, start, end) tuples, where data[start:end] is the lexeme.
+
+        Raises:
+        ScanningError -- If no token can be matched at some position.
+
+        >>> from pylex.reparser import RegexParser
+        >>> from pylex.rescanner import RegexScanner
+        >>> from pylex.ast import asts_to_nfa
+        >>> asts = RegexParser(RegexScanner('if\\n[a-z]+\\n[ ]+')).parse_top_level()
+        >>> list(LazyDFA(asts_to_nfa(asts)).scan('if iffy'))
+        [(1, 0, 2), (3, 2, 3), (2, 3, 7)]
+        """
+
+        (classes, limit) = _translate(data, self._translation)
+        self.simulating = False
+        pos = 0
+        for token in self._scan_lazily(classes):
+            yield token
+            pos = token[2]
+        if self.simulating:
+            for token in self._simulate(classes, pos):
+                yield token
+                pos = token[2]
+        if pos < len(classes):
+            raise ScanningError('no token at offset {}'.format(pos))
+        if limit is not None:
+            raise ScanningError('no token at offset {}'.format(limit))
+
+    def _scan_lazily(self, data):
+        """Generate the tokens in a sequence of class IDs with the cached DFA
+        until there is no token or the cache thrashes.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        accepting = self._accepting
+        transitions = self._transitions
+
+        # The amount of input scanned since the cache was last flushed.
+        scanned = 0
+
+        n = len(data)
+        pos = 0
+        while pos < n:
+            state = 0
+            category = 0
+            end = pos
+
+            i = pos
+            while i < n:
+                c = data[i]
+                target = transitions[state * num_classes + c]
+                if target == _UNKNOWN:
+                    config = self._move(self._configs[state], c)
+                    if not config:
+                        target = -1
+                    elif config in self._numbers:
+                        target = self._numbers[config]
+                    else:
+                        if len(self._configs) >= self.max_states:
+                            # Building states is only worth it if each one is
+                            # used for several input symbols on average.
+                            if scanned + i - pos < 10 * self.max_states:
+                                self.simulating = True
+                                self._flush()
+                                return
+                            self.flushes += 1
+                            self._flush()
+                            scanned = -(i - pos)
+                            # The current state was flushed, so the
+                            # transition can't be recorded.
+                            state = None
+                        target = self._add_state(config)
+                    if state is not None:
+                        transitions[state * num_classes + c] = target
+                if target < 0:
+                    break
+                i += 1
+                state = target
+                if accepting[state]:
+                    category = accepting[state]
+                    end = i
+
+            if not category:
+                return
+
+            yield (category, pos, end)
+            scanned += end - pos
+            pos = end
+
+    def _simulate(self, data, pos):
+        """Generate the tokens in a sequence of class IDs starting at the given
+        position by simulating the NFA.
+
+        """
+
+        n = len(data)
+        while pos < n:
+            config = self._initial
+            category = 0
+            end = pos
+
+            i = pos
+            while i < n:
+                config = self._move(config, data[i])
+                if not config:
+                    break
+                i += 1
+                accepting = self._config_accepting(config)
+                if accepting:
+                    category = accepting
+                    end = i
+
+            if not category:
+                return
+
+            yield (category, pos, end)
+            pos = end
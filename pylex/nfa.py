@@ -1,5 +1,6 @@
 """Nondeterministic finite automaton class."""
 
+from pylex.alphabet import Alphabet, bitmap_to_symbols, symbols_label
 from pylex.automaton import Automaton, AutomatonState
 
 
@@ -9,16 +10,79 @@ class NFA(Automaton):
     Each state can have multiple transitions on a single symbol as well as
     transitions without consuming any input (so-called epsilon transitions).
 
+    Attributes:
+    alphabet -- The Alphabet partitioning the symbols of this NFA into
+    equivalence classes.
+
     """
 
-    def __init__(self, initial):
+    def __init__(self, initial, alphabet=None):
+        """Create a new NFA with the given initial state.
+
+        Arguments:
+        initial -- The initial automaton state.
+        alphabet -- The Alphabet of this NFA. Every symbol transition must be
+        on a symbol which is interchangeable with the other symbols in its
+        class. Defaults to the partition which puts each symbol used on a
+        transition in its own class.
+
+        """
+
         super().__init__(initial)
 
-    def to_dfa(self):
-        """Convert this NFA to an equivalent DFA."""
+        if alphabet is None:
+            alphabet = Alphabet(_transition_symbols(symbol) for state in self.states
+                                for symbol in state.transitions if symbol is not None)
+        self.alphabet = alphabet
+
+    def _symbol_label(self, symbol):
+        if isinstance(symbol, int):
+            return symbols_label(bitmap_to_symbols(symbol))
+        return super()._symbol_label(symbol)
+
+    def to_dfa(self, bitsets=False, compact=False):
+        """Convert this NFA to an equivalent DFA.
+
+        Arguments:
+        bitsets -- Whether the subset construction should represent
+        configurations as bitsets rather than sets of states.
+        compact -- Whether to return a CompactDFA rather than a DFA.
+
+        """
 
         from pylex.rabinscott import RabinScott
-        return RabinScott(self)()
+        return RabinScott(self, bitsets, compact)()
+
+    def reduced(self):
+        """Return an equivalent NFA without epsilon transitions, useless
+        states or states with the same outgoing transitions.
+
+        The reduced NFA matches every input with the same accepting ID, so it
+        can be converted to a DFA instead of this NFA.
+
+        >>> from pylex.ast import asts_to_nfa
+        >>> from pylex.reparser import RegexParser
+        >>> from pylex.rescanner import RegexScanner
+        >>> nfa = asts_to_nfa(RegexParser(RegexScanner('(a|b)*abb')).parse_top_level())
+        >>> (nfa.num_states, nfa.reduced().num_states)
+        (15, 4)
+        """
+
+        from pylex.reduction import Reduction
+        return Reduction(self)()
+
+    def to_lazy_dfa(self, max_memory=1 << 22):
+        """Return a LazyDFA which scans with this NFA, building the states of
+        the equivalent DFA only as they are needed.
+
+        Arguments:
+        max_memory -- The approximate maximum number of bytes used by the
+        cached DFA states.
+
+        """
+
+        from pylex.lazydfa import LazyDFA
+        return LazyDFA(self, max_memory)
 
 
 class NFAState(AutomatonState):
@@ -26,8 +90,11 @@ class NFAState(AutomatonState):
 
     Attributes:
     transitions -- A set of outgoing transitions from this state represented as
-    a dictionary from characters or None (representing epsilon) to a set of
-    states.
+    a dictionary to an insertion-ordered set of states (a dictionary whose
+    values are all None). The keys are characters, None (representing
+    epsilon), or integer bitmaps of characters (see
+    pylex.alphabet.symbols_to_bitmap) for transitions on any of several
+    characters.
 
     """
 
@@ -35,17 +102,17 @@ class NFAState(AutomatonState):
         super().__init__(accepting)
 
     def _all_transitions(self):
-        transitions = set()
-        for symbol, targets in self.transitions.items():
-            transitions |= {(symbol, target) for target in targets}
-        return transitions
+        return [(symbol, target)
+                for (symbol, targets) in self.transitions.items()
+                for target in targets]
 
     def add_transition(self, symbol, to):
         """Add a transition to this state.
 
         Arguments:
         symbol -- The symbol on which to take the transition; can also be None
-        to represent epsilon.
+        to represent epsilon or a bitmap of symbols to take the transition on
+        any of them.
         to -- The state to transition to on the given symbol.
 
         >>> state1 = NFAState()
@@ -67,10 +134,50 @@ class NFAState(AutomatonState):
         except AttributeError:
             pass
 
-        try:
-            self.transitions[symbol].add(to)
-        except KeyError:
-            self.transitions[symbol] = {to}
+        self.transitions.setdefault(symbol, {})[to] = None
+
+    def class_transitions(self, alphabet):
+        """Return the symbol transitions of this state grouped by class.
+
+        A transition on a single symbol is only included if the symbol is the
+        representative of its class: a class can only contain several symbols
+        if they appear together in every set of symbols that the automaton
+        can match at a single position, so the transitions on the other
+        symbols of the class are interchangeable with it.
+
+        Arguments:
+        alphabet -- The Alphabet of the automaton.
+
+        Returns:
+        A dictionary from class ID to an insertion-ordered set of target
+        states.
+
+        >>> state1 = NFAState()
+        >>> state2 = NFAState()
+        >>> alphabet = Alphabet([{'a'}, {'b', 'c'}])
+        >>> state1.add_transition('a', state1)
+        >>> state1.add_transition(0b111 << ord('a'), state2)
+        >>> moves = state1.class_transitions(alphabet)
+        >>> list(moves[alphabet.class_of[ord('a')]]) == [state1, state2]
+        True
+        >>> list(moves[alphabet.class_of[ord('c')]]) == [state2]
+        True
+        """
+
+        moves = {}
+        for (symbol, targets) in self.transitions.items():
+            if symbol is None:
+                continue
+            if isinstance(symbol, int):
+                classes = alphabet.classes_in(symbol)
+            else:
+                class_id = alphabet.class_of[ord(symbol)]
+                if symbol != alphabet.representative(class_id):
+                    continue
+                classes = (class_id,)
+            for class_id in classes:
+                moves.setdefault(class_id, {}).update(targets)
+        return moves
 
     def epsilon_closure(self):
         """Compute the epsilon closure for this state.
@@ -98,10 +205,18 @@ class NFAState(AutomatonState):
             worklist = [self]
             while worklist:
                 state = worklist.pop()
-                for target in state.transitions.get(None, set()):
+                for target in state.transitions.get(None, ()):
                     if target not in epsilon_closure:
                         epsilon_closure.add(target)
                         worklist.append(target)
 
             self._epsilon_closure = frozenset(epsilon_closure)
             return self._epsilon_closure
+
+
+def _transition_symbols(symbol):
+    """Return the set of symbols of a non-epsilon transition key."""
+
+    if isinstance(symbol, int):
+        return set(bitmap_to_symbols(symbol))
+    return {symbol}
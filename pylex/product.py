@@ -0,0 +1,86 @@
+"""Implementation of the product construction for combining scanner DFAs."""
+
+from array import array
+
+from pylex.alphabet import Alphabet
+from pylex.dfa import CompactDFA
+
+
+class ProductConstruction:
+    """Product construction: combine the DFAs of several rules into one DFA
+    which recognizes all of them.
+
+    Each state of the product is the tuple of the states that the component
+    DFAs are in after reading the same input. The tuples are sparse: they only
+    contain (component index, state number) pairs for the components which
+    have not yet rejected the input, so the cost of a product state shrinks as
+    rules drop out.
+
+    Earlier components have priority: a product state accepts the rule ID
+    i + 1 of the first component i which accepts, just like the NFA built by
+    asts_to_nfa. The product transitions are keyed by the classes of the
+    common refinement of the component alphabets.
+
+    """
+
+    def __init__(self, dfas):
+        """Create a product constructor for the given list of DFAs or
+        CompactDFAs, one per rule in priority order.
+
+        """
+
+        self.dfas = [dfa.to_compact() for dfa in dfas]
+        self.alphabet = Alphabet(symbols for dfa in self.dfas
+                                 for symbols in dfa.alphabet.classes)
+
+        # component_classes[i][c] is the class ID in the alphabet of component
+        # i corresponding to class ID c of the product.
+        self.component_classes = []
+        for dfa in self.dfas:
+            class_of = dfa.alphabet.class_of
+            self.component_classes.append([class_of[ord(self.alphabet.representative(c))]
+                                           for c in range(self.alphabet.num_classes)])
+
+    def __call__(self):
+        num_classes = self.alphabet.num_classes
+        components = [(dfa.transitions, dfa.alphabet.num_classes, classes)
+                      for (dfa, classes) in zip(self.dfas, self.component_classes)]
+
+        accepting = array('i')
+        transitions = array('i')
+        numbers = {}
+        worklist = []
+
+        def number(q):
+            try:
+                return numbers[q]
+            except KeyError:
+                numbers[q] = len(accepting)
+                accepting.append(self._accepting(q))
+                transitions.extend(array('i', [-1]) * num_classes)
+                worklist.append(q)
+                return numbers[q]
+
+        number(tuple((i, 0) for i in range(len(self.dfas))))
+        while worklist:
+            q = worklist.pop()
+            row = numbers[q] * num_classes
+            for c in range(num_classes):
+                t = []
+                for (i, s) in q:
+                    (component_transitions, component_num_classes, classes) = components[i]
+                    target = component_transitions[s * component_num_classes + classes[c]]
+                    if target >= 0:
+                        t.append((i, target))
+                if t:
+                    transitions[row + c] = number(tuple(t))
+
+        return CompactDFA(self.alphabet, accepting, transitions)
+
+    def _accepting(self, q):
+        """Return the accepting ID of a product state."""
+
+        for (i, s) in q:
+            if self.dfas[i].accepting[s]:
+                return i + 1
+        return 0
@@ -3,8 +3,9 @@ construction).
 
 """
 
-from pylex import SIGMA
-from pylex.dfa import DFA, DFAState
+from array import array
+
+from pylex.dfa import DFA, DFAState, CompactDFA
 from pylex.nfa import NFA, NFAState
 
 
@@ -12,14 +13,47 @@ class RabinScott:
     """Rabin-Scott powerset construction: convert this NFA to an equivalent
     DFA.
 
+    Transitions are computed once per equivalence class of the NFA's alphabet
+    rather than once per symbol, and the resulting DFA's transitions are keyed
+    by class ID.
+
+    By default, configurations are represented as frozensets of NFA states. In
+    bitset mode, NFA states are referred to by their number, and
+    configurations, epsilon closures, and transition targets are represented
+    as integers with the bit for each member state set, so that unions and
+    hashing are single big integer operations.
+
+    The result is either a DFA made of DFAState objects or, in compact mode, a
+    CompactDFA whose tables are filled in directly.
+
     """
 
-    def __init__(self, nfa):
-        """Create an NFA to DFA converter for the given NFA."""
+    def __init__(self, nfa, bitsets=False, compact=False):
+        """Create an NFA to DFA converter for the given NFA.
+
+        Arguments:
+        nfa -- The NFA to convert.
+        bitsets -- Whether to represent configurations as bitsets.
+        compact -- Whether to return a CompactDFA instead of a DFA.
+
+        """
 
         self.initial = nfa.initial
+        self.alphabet = nfa.alphabet
+        self.states = nfa.states
+        self.bitsets = bitsets
+        self.compact = compact
+        self._moves = {}
+
+        if compact:
+            self._accepting = array('i')
+            self._transitions = array('i')
+            self._empty_row = array('i', [-1]) * self.alphabet.num_classes
 
     def __call__(self):
+        if self.bitsets:
+            return self._bitset_construction()
+
         # Initial configuration
         q0 = self.initial.epsilon_closure()
 
@@ -30,8 +64,8 @@ class RabinScott:
         while worklist:
             q = worklist.pop()
 
-            for symbol in SIGMA:
-                t = self._delta_closure(q, symbol)
+            for class_id in range(self.alphabet.num_classes):
+                t = self._delta_closure(q, class_id)
 
                 if t:
                     try:
@@ -41,20 +75,94 @@ class RabinScott:
                         Q[t] = dfa_state
                         worklist.append(t)
 
-                    Q[q].add_transition(symbol, dfa_state)
+                    self._add_transition(Q[q], class_id, dfa_state)
+
+        return self._result(Q[q0])
+
+    def _bitset_construction(self):
+        closures = {}
 
-        return DFA(Q[q0])
+        def epsilon_closure(state):
+            try:
+                return closures[state.number]
+            except KeyError:
+                closure = 0
+                for member in state.epsilon_closure():
+                    closure |= 1 << member.number
+                closures[state.number] = closure
+                return closure
 
-    def _delta_closure(self, q, c):
-        """Return EpsilonClosure(Delta(q, c))."""
+        # For each NFA state, a list of (class ID, bitset) pairs where the
+        # bitset is EpsilonClosure(Delta(state, class)).
+        moves = []
+        for state in self.states:
+            state_moves = {}
+            for (class_id, targets) in state.class_transitions(self.alphabet).items():
+                for target in targets:
+                    state_moves[class_id] = state_moves.get(class_id, 0) | epsilon_closure(target)
+            moves.append(list(state_moves.items()))
+
+        accepting = [state.accepting for state in self.states]
+
+        # Map from known configuration to corresponding DFA state
+        Q = {}
+        worklist = []
+
+        def dfa_state(q):
+            try:
+                return Q[q]
+            except KeyError:
+                pass
+
+            # Gather the transitions and accepting ID of every member state.
+            accepting_id = None
+            q_moves = {}
+            members = q
+            while members:
+                low = members & -members
+                i = low.bit_length() - 1
+                members ^= low
+
+                if accepting[i] and (accepting_id is None or accepting[i] < accepting_id):
+                    accepting_id = accepting[i]
+                for (class_id, t) in moves[i]:
+                    q_moves[class_id] = q_moves.get(class_id, 0) | t
+
+            state = self._new_state(accepting_id)
+            Q[q] = state
+            worklist.append((state, q_moves))
+            return state
+
+        initial = dfa_state(epsilon_closure(self.initial))
+        while worklist:
+            (state, q_moves) = worklist.pop()
+            for class_id in sorted(q_moves):
+                self._add_transition(state, class_id, dfa_state(q_moves[class_id]))
+
+        return self._result(initial)
+
+    def _delta_closure(self, q, class_id):
+        """Return EpsilonClosure(Delta(q, c)) for the symbols c in the given
+        class.
+
+        """
 
         delta_closure = set()
         for state in q:
-            for target in state.transitions.get(c, set()):
+            for target in self._class_transitions(state).get(class_id, ()):
                 delta_closure |= target.epsilon_closure()
 
         return frozenset(delta_closure)
 
+    def _class_transitions(self, state):
+        """Return the memoized transitions of an NFA state grouped by class."""
+
+        try:
+            return self._moves[state]
+        except KeyError:
+            self._moves[state] = state.class_transitions(self.alphabet)
+            return self._moves[state]
+
     def _configuration_to_dfa_state(self, q):
         """Create a DFA state from the given configuration.
 
@@ -70,4 +178,38 @@ class RabinScott:
         except ValueError:
             accepting = None
 
-        return DFAState(accepting)
+        return self._new_state(accepting)
+
+    def _new_state(self, accepting):
+        """Create a DFA state with the given accepting ID.
+
+        Returns:
+        The new DFAState or, in compact mode, the new state number.
+
+        """
+
+        if self.compact:
+            number = len(self._accepting)
+            self._accepting.append(accepting or 0)
+            self._transitions.extend(self._empty_row)
+            return number
+        else:
+            return DFAState(accepting)
+
+    def _add_transition(self, state, class_id, target):
+        """Add a transition between two states returned by _new_state."""
+
+        if self.compact:
+            self._transitions[state * self.alphabet.num_classes + class_id] = target
+        else:
+            state.add_transition(class_id, target)
+
+    def _result(self, initial):
+        """Return the constructed automaton given its initial state."""
+
+        if self.compact:
+            # The initial state is always created first.
+            assert initial == 0
+            return CompactDFA(self.alphabet, self._accepting, self._transitions)
+        else:
+            return DFA(initial, self.alphabet)
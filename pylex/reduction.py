@@ -0,0 +1,188 @@
+"""Reduction of NFAs before the subset construction."""
+
+from pylex.nfa import NFA, NFAState
+
+
+class Reduction:
+    """Reduce the number of states of an NFA without changing the language it
+    recognizes or the accepting ID of any input.
+
+    Thompson's construction creates many states which only have epsilon
+    transitions. The reduction takes three steps:
+
+    1. Epsilon elimination: only the initial state and the targets of symbol
+       transitions are kept. Each of them gets the symbol transitions of every
+       state in its epsilon closure, and the lowest accepting ID of those
+       states, so a configuration of the reduced NFA accepts the same ID as the
+       epsilon closure it stands for in the original NFA.
+    2. Trimming: states which cannot reach an accepting state are dropped.
+    3. Merging: states with the same accepting ID and the same transitions
+       recognize the same language and are merged. Merging states can make
+       their predecessors identical, so those are checked again.
+
+    Transitions on bitmaps of symbols are kept as they are; the reduced NFA
+    has the same alphabet.
+
+    """
+
+    def __init__(self, nfa):
+        """Create an NFA reducer for the given NFA."""
+
+        self.nfa = nfa
+
+    def __call__(self):
+        self._eliminate_epsilons()
+        self._trim()
+        self._merge()
+        return self._build_nfa()
+
+    def _eliminate_epsilons(self):
+        """Compute the transitions of the states which are kept.
+
+        self.transitions is a list with an entry for each kept state, numbered
+        in the order they are found, which maps each transition key to the set
+        of the numbers of the target states. self.accepting is a list of the
+        accepting ID of each kept state, or None.
+
+        """
+
+        numbers = {self.nfa.initial: 0}
+        kept = [self.nfa.initial]
+        self.transitions = []
+        self.accepting = []
+
+        for state in kept:
+            moves = {}
+            accepting = None
+            for member in self._epsilon_closure(state):
+                if member.accepting and (accepting is None or member.accepting < accepting):
+                    accepting = member.accepting
+                for (symbol, targets) in member.transitions.items():
+                    if symbol is None:
+                        continue
+                    move = moves.setdefault(symbol, set())
+                    for target in targets:
+                        if target not in numbers:
+                            numbers[target] = len(kept)
+                            kept.append(target)
+                        move.add(numbers[target])
+            self.transitions.append(moves)
+            self.accepting.append(accepting)
+
+    @staticmethod
+    def _epsilon_closure(state):
+        """Return a list of the states in the epsilon closure of a state.
+
+        Unlike NFAState.epsilon_closure, the states are listed in a
+        deterministic order, so the reduced NFA doesn't depend on how states
+        are hashed.
+
+        """
+
+        closure = [state]
+        seen = {state}
+        for member in closure:
+            for target in member.transitions.get(None, ()):
+                if target not in seen:
+                    seen.add(target)
+                    closure.append(target)
+        return closure
+
+    def _trim(self):
+        """Remove the transitions to states which cannot reach an accepting
+        state.
+
+        self.predecessors is a list mapping each state number to a list of
+        the numbers of the states with transitions to it.
+
+        """
+
+        self.predecessors = predecessors = [[] for s in self.transitions]
+        for (s, moves) in enumerate(self.transitions):
+            for targets in moves.values():
+                for t in targets:
+                    predecessors[t].append(s)
+
+        live = {s for (s, accepting) in enumerate(self.accepting) if accepting}
+        worklist = list(live)
+        while worklist:
+            for s in predecessors[worklist.pop()]:
+                if s not in live:
+                    live.add(s)
+                    worklist.append(s)
+
+        for moves in self.transitions:
+            for symbol in list(moves):
+                moves[symbol] &= live
+                if not moves[symbol]:
+                    del moves[symbol]
+
+    def _merge(self):
+        """Merge the states with the same accepting ID and transitions.
+
+        Whenever a state is merged, the transitions of its predecessors are
+        redirected to the state it was merged into, and the predecessors are
+        checked again.
+
+        self.representative maps each state number to the number of the state
+        which is kept in its place.
+
+        """
+
+        transitions = self.transitions
+        predecessors = self.predecessors
+        self.representative = representative = list(range(len(transitions)))
+
+        signatures = {}
+        signature_of = [None] * len(transitions)
+        worklist = list(reversed(range(len(transitions))))
+        while worklist:
+            s = worklist.pop()
+            if representative[s] != s:
+                continue
+
+            old = signature_of[s]
+            if old is not None and signatures.get(old) == s:
+                del signatures[old]
+            signature = (self.accepting[s],
+                         frozenset((symbol, frozenset(targets))
+                                   for (symbol, targets) in transitions[s].items()))
+            signature_of[s] = signature
+
+            r = signatures.setdefault(signature, s)
+            if r != s:
+                representative[s] = r
+                for p in predecessors[s]:
+                    if representative[p] == p:
+                        for targets in transitions[p].values():
+                            if s in targets:
+                                targets.remove(s)
+                                targets.add(r)
+                        worklist.append(p)
+                predecessors[r].extend(predecessors[s])
+
+        # A state can be merged into one which is merged into another one
+        # later, so follow each chain to the state at its end, compressing the
+        # path on the way.
+        for s in range(len(representative)):
+            root = s
+            while representative[root] != root:
+                root = representative[root]
+            while representative[s] != root:
+                (representative[s], s) = (root, representative[s])
+
+    def _build_nfa(self):
+        """Create the reduced NFA from the representative states."""
+
+        representative = self.representative
+        states = {}
+        for (s, r) in enumerate(representative):
+            if r == s:
+                states[s] = NFAState(self.accepting[s])
+
+        for (s, state) in states.items():
+            for (symbol, targets) in self.transitions[s].items():
+                for t in sorted(targets):
+                    state.add_transition(symbol, states[t])
+
+        return NFA(states[representative[0]], self.nfa.alphabet)
@@ -1,6 +1,7 @@
 """Syntactic analysis phase of the regular expression compiler."""
 
-from pylex.ast import SymbolAST, KleeneAST, PositiveAST, AlternationAST, ConcatenationAST
+from pylex.ast import (SymbolAST, CharClassAST, KleeneAST, PositiveAST, AlternationAST,
+                       ConcatenationAST)
 from pylex.rescanner import RegexScanner
 from pylex.token import Token
 
@@ -45,11 +46,13 @@ class RegexParser:
         >>> RegexParser(RegexScanner('A\\n((B))\\nC*')).parse_top_level()
         [SymbolAST('A'), SymbolAST('B'), KleeneAST(SymbolAST('C'))]
         >>> RegexParser(RegexScanner('XYZ*')).parse_top_level()
-        [ConcatenationAST(SymbolAST('X'), ConcatenationAST(SymbolAST('Y'), KleeneAST(SymbolAST('Z'))))]
+        [ConcatenationAST(SymbolAST('X'), SymbolAST('Y'), KleeneAST(SymbolAST('Z')))]
         >>> RegexParser(RegexScanner('P|Q|R')).parse_top_level()
-        [AlternationAST(SymbolAST('P'), AlternationAST(SymbolAST('Q'), SymbolAST('R')))]
+        [AlternationAST(SymbolAST('P'), SymbolAST('Q'), SymbolAST('R'))]
         >>> RegexParser(RegexScanner('ab|c')).parse_top_level()
         [AlternationAST(ConcatenationAST(SymbolAST('a'), SymbolAST('b')), SymbolAST('c'))]
+        >>> RegexParser(RegexScanner('"[a-c]*"')).parse_top_level()
+        [ConcatenationAST(SymbolAST('"'), KleeneAST(CharClassAST(0xe000000000000000000000000)), SymbolAST('"'))]
         >>> RegexParser(RegexScanner('(A')).parse_top_level()
         Traceback (most recent call last):
             ...
@@ -85,53 +88,101 @@ class RegexParser:
         return asts
 
     def _parse_regex(self):
-        """<regex> ::= <alternation>"""
-        return self._parse_alternation()
+        """Parse a regular expression.
+
+        The grammar is
+
+            <regex> ::= <alternation>
+            <alternation> ::= <concatenation> | <concatenation> '|' <alternation>
+            <concatenation> ::= <closure> | <closure> <concatenation>
+            <closure> ::= <term> | <term> '*' | <term> '+'
+            <term> ::= symbol | character-class | '(' <regex> ')'
+
+        The parser is iterative rather than recursive descent: the operands of
+        the alternation and concatenation being parsed are collected in lists,
+        and an explicit stack holds the lists of the enclosing parentheticals.
+        Each alternation and concatenation is built as a single flat node, so
+        parsing takes linear time and arbitrarily long or deeply nested
+        expressions cannot overflow the Python stack.
+
+        """
+
+        # A stack of (alternatives, terms) lists of enclosing parentheticals.
+        stack = []
+        alternatives = []
+        terms = []
+
+        while True:
+            category = self._current_token.category
+
+            if category == Token.LPAREN:
+                # Eat the opening paren.
+                self._consume_token()
+                stack.append((alternatives, terms))
+                alternatives = []
+                terms = []
+                continue
+
+            ast = self._parse_term()
+
+            while True:
+                terms.append(self._parse_closure(ast))
+
+                category = self._current_token.category
+                if category != Token.RPAREN or not stack:
+                    break
+
+                # Eat the closing paren.
+                self._consume_token()
+                alternatives.append(self._concatenation(terms))
+                ast = self._alternation(alternatives)
+                (alternatives, terms) = stack.pop()
+
+            if category in (Token.SYMBOL, Token.CHARCLASS, Token.LPAREN):
+                continue
+
+            alternatives.append(self._concatenation(terms))
+            terms = []
+
+            if category == Token.PIPE:
+                # Eat the pipe.
+                self._consume_token()
+            elif stack:
+                raise ParsingError('unmatched parentheses')
+            else:
+                return self._alternation(alternatives)
 
     def _parse_term(self):
-        """<term> ::= symbol | character-class | <parenthetical>"""
+        """<term> ::= symbol | character-class
+
+        Parenthetical terms are handled by _parse_regex.
+
+        """
 
         if self._current_token.category == Token.SYMBOL:
             ast = SymbolAST(self._current_token.symbol)
             # Eat the symbol.
             self._consume_token()
             return ast
-        if self._current_token.category == Token.CHARCLASS:
+        elif self._current_token.category == Token.CHARCLASS:
             char_class = self._current_token.char_class
-            if len(char_class) > 1:
-                symbols = (SymbolAST(c) for c in char_class)
-                ast = AlternationAST(*symbols)
+            if char_class & (char_class - 1):
+                ast = CharClassAST(char_class)
             else:
-                ast = SymbolAST(next(iter(char_class)))
+                ast = SymbolAST(chr(char_class.bit_length() - 1))
             # Eat the character class.
             self._consume_token()
             return ast
-        elif self._current_token.category == Token.LPAREN:
-            return self._parse_parenthetical()
         else:
             raise ParsingError('expected regex term')
 
-    def _parse_parenthetical(self):
-        """<parenthetical> ::= '(' <regex> ')'"""
-
-        assert self._current_token.category == Token.LPAREN
-        # Eat the opening paren.
-        self._consume_token()
-
-        ast = self._parse_regex()
+    def _parse_closure(self, ast):
+        """<closure> ::= <term> | <term> '*' | <term> '+'
 
-        if self._current_token.category != Token.RPAREN:
-            raise ParsingError('unmatched parentheses')
-
-        # Eat the closing paren.
-        self._consume_token()
-
-        return ast
-
-    def _parse_closure(self):
-        """<closure> ::= <term> | <term> '*' | <term> '+'"""
+        Arguments:
+        ast -- The AST of the term, which has already been parsed.
 
-        ast = self._parse_term()
+        """
 
         if self._current_token.category == Token.STAR:
             ast = KleeneAST(ast)
@@ -144,28 +195,14 @@ class RegexParser:
 
         return ast
 
-    def _parse_concatenation(self):
-        """<concatenation> ::= <closure> | <closure> <concatenation>"""
-
-        lhs = self._parse_closure()
+    @staticmethod
+    def _concatenation(terms):
+        """Return the AST of the concatenation of a non-empty list of ASTs."""
 
-        if self._current_token.category in [Token.SYMBOL, Token.LPAREN]:
-            rhs = self._parse_concatenation()
-            return ConcatenationAST(lhs, rhs)
-        else:
-            # There is no valid right-hand side, return what we got.
-            return lhs
-
-    def _parse_alternation(self):
-        """<alternation> ::= <concatenation> | <concatenation> '|' <alternation>"""
+        return terms[0] if len(terms) == 1 else ConcatenationAST(*terms)
 
-        lhs = self._parse_concatenation()
+    @staticmethod
+    def _alternation(alternatives):
+        """Return the AST of the alternation of a non-empty list of ASTs."""
 
-        if self._current_token.category == Token.PIPE:
-            # Eat the pipe.
-            self._consume_token()
-            rhs = self._parse_alternation()
-            return AlternationAST(lhs, rhs)
-        else:
-            # There is no valid right-hand side, return what we got.
-            return lhs
+        return alternatives[0] if len(alternatives) == 1 else AlternationAST(*alternatives)
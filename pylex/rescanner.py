@@ -1,6 +1,6 @@
 """Lexical analysis phase of the regular expression compiler."""
 
-from pylex import SIGMA
+from pylex import NUM_SYMBOLS
 from pylex.token import Token
 
 
@@ -11,7 +11,20 @@ class ScanningError(Exception):
 
 
 class RegexScanner:
-    """A regular expression scanner (a.k.a. lexer)."""
+    """A regular expression scanner (a.k.a. lexer).
+
+    The input is read in large blocks into a buffer which the scanner advances
+    through by index.
+
+    Attributes:
+    line -- The line number of the last character read, starting at 1.
+    column -- The column number of the last character read in its line,
+    starting at 1, or 0 if no character has been read from the line.
+
+    """
+
+    # The number of characters to read from a file at a time.
+    _BLOCK_SIZE = 1 << 16
 
     _char_to_category = {
         '': Token.EOF,
@@ -43,8 +56,16 @@ class RegexScanner:
 
         """
 
-        self._input = input
+        if isinstance(input, str):
+            self._input = None
+            self._buffer = input
+        else:
+            self._input = input
+            self._buffer = ''
+        self._pos = 0
         self._log_file = log_file
+        self.line = 1
+        self.column = 0
 
     def close(self):
         """Close the input file.
@@ -54,11 +75,11 @@ class RegexScanner:
 
         """
 
-        try:
+        if self._input is not None:
             self._input.close()
-        except AttributeError:
-            pass
         self._input = None
+        self._buffer = ''
+        self._pos = 0
 
     def _getc(self):
         """Read a single character from the input and advance the position of
@@ -69,12 +90,28 @@ class RegexScanner:
 
         """
 
-        try:
-            c = self._input.read(1)
-        except AttributeError:
-            c, self._input = self._input[0:1], self._input[1:]
+        if self._pos == len(self._buffer):
+            if self._input is None:
+                return ''
+            self._buffer = self._input.read(self._BLOCK_SIZE)
+            self._pos = 0
+            if not self._buffer:
+                return ''
+
+        c = self._buffer[self._pos]
+        self._pos += 1
+        if c == '\n':
+            self.line += 1
+            self.column = 0
+        else:
+            self.column += 1
         return c
 
+    def _error(self, message):
+        """Return a ScanningError for the current position."""
+
+        return ScanningError('{} at line {}, column {}'.format(message, self.line, self.column))
+
     def lex(self):
         """Lex a single token from the input.
 
@@ -106,7 +143,7 @@ class RegexScanner:
 
         c = self._getc()
         if c == '':
-            raise ScanningError('trailing backslash')
+            raise self._error('trailing backslash')
         elif c in self._escape_sequence:
             return Token(Token.SYMBOL, self._escape_sequence[c])
         else:
@@ -118,7 +155,7 @@ class RegexScanner:
 
         """
 
-        characters = set()
+        char_class = 0
         inverted = False
 
         c = self._getc()
@@ -129,7 +166,7 @@ class RegexScanner:
         if c == ']':
             # If there is a ']' at the beginning of the character class, it is
             # literal.
-            characters.add(']')
+            char_class |= 1 << ord(']')
             c = self._getc()
 
         range_start = ''
@@ -140,30 +177,29 @@ class RegexScanner:
                 if prev_c:
                     range_start = prev_c
                 else:
-                    characters.add('-')
+                    char_class |= 1 << ord('-')
             else:
                 if range_start:
                     assert prev_c == '-'
                     start_i = ord(range_start)
                     end_i = ord(c)
                     if end_i < start_i:
-                        raise ScanningError('invalid range end')
+                        raise self._error('invalid range end')
                     range_start = ''
-                    characters.update(chr(c) for c in range(start_i, end_i + 1))
+                    char_class |= (1 << end_i + 1) - (1 << start_i)
                 else:
-                    characters.add(c)
+                    char_class |= 1 << ord(c)
             prev_c, c = c, self._getc()
 
         if not c:
-            raise ScanningError('unmatched [ or [^')
+            raise self._error('unmatched [ or [^')
 
         if prev_c == '-':
             # Trailing hyphen, literal.
             if range_start:
-                characters.add(range_start)
-            characters.add('-')
+                char_class |= 1 << ord(range_start)
+            char_class |= 1 << ord('-')
 
         if inverted:
-            return Token(Token.CHARCLASS, set(SIGMA) - characters)
-        else:
-            return Token(Token.CHARCLASS, characters)
+            char_class ^= (1 << NUM_SYMBOLS) - 1
+        return Token(Token.CHARCLASS, char_class)
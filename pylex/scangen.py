@@ -11,6 +11,9 @@ class _ScannerGenerator:
     it is called. The specifics for the interface depend on the language in
     which the scanner was generated.
 
+    Subclasses generate the code which matches a single token; the runtime
+    which manages the input is shared.
+
     """
 
     def __init__(self, dfa):
@@ -18,153 +21,569 @@ class _ScannerGenerator:
         given DFA.
 
         Arguments:
-        dfa -- The DFA to generate a scanner for.
+        dfa -- The DFA or CompactDFA to generate a scanner for.
 
         """
 
-        self._table = [None] * dfa.num_states
-        self._accepting = [-1] * dfa.num_states
-        self._create_table(dfa.initial, set())
-
-    def _create_table(self, state, seen):
-        if state in seen:
-            return
-        seen.add(state)
-
-        number = state.number
-
-        self._table[state.number] = [-1] * NUM_SYMBOLS
-        self._accepting[state.number] = state.accepting if state.accepting else 0
-
-        for (symbol, target) in state.transitions.items():
-            self._create_table(target, seen)
-            self._table[state.number][ord(symbol)] = target.number
+        dfa = dfa.to_compact()
+        self._num_classes = dfa.alphabet.num_classes
+        self._symbol_classes = dfa.alphabet.class_of
+        self._table = [list(dfa.row(state)) for state in range(dfa.num_states)]
+        self._accepting = dfa.accepting
 
     def c_source(self):
         """Return the C source code for the scanner as a string.
 
-        The scanner is returned as a function specified as follows:
+        The scanner is reentrant: all of the state for scanning a stream is
+        kept in a scanner context, so different streams can be scanned
+        concurrently from different threads. The interface is declared by the
+        header returned by c_header.
 
-        /**
-         * Lex a token from the given stream.
-         * @param category_out Return parameter for the syntactic category of
-         * the token.
-         * @return The malloc-allocated lexeme; can be freed with free. NULL if
-         * the scanner failed to find a token.
-         */
-        char *pylex(FILE *file, int *category_out);
+        The input is read in large blocks into a buffer owned by the scanner
+        context, so a stream should not be read by anything else while it is
+        being scanned.
         """
 
-        raise NotImplementedError
+        return self._c_includes() + self._c_matcher() + self._c_runtime()
 
+    def c_header(self):
+        """Return a C header declaring the interface of the scanner as a
+        string.
 
-class TableDrivenScannerGenerator(_ScannerGenerator):
-    """Scanner generator for a table-driven scanner."""
+        """
 
-    def __init__(self, dfa):
-        super().__init__(dfa)
+        return \
+"""\
+#ifndef PYLEX_H
+#define PYLEX_H
 
-    def c_source(self):
-        def initializer_list(l):
-            return '{{{}}}'.format(', '.join(str(x) for x in l))
+#include <stdio.h>
 
-        def nested_initializer_list(ll):
-            initializer_lists = ('    ' + initializer_list(l) + ',' for l in ll)
-            return '{{\n{}\n}}'.format('\n'.join(initializer_lists))
+/* The state of a scanner for one stream. */
+struct pylex_scanner;
+
+/**
+ * Create a scanner for the given stream.
+ * @return The scanner, or NULL if memory is exhausted.
+ */
+struct pylex_scanner *pylex_create(FILE *file);
+
+/**
+ * Free a scanner created by pylex_create. The stream is not closed.
+ */
+void pylex_destroy(struct pylex_scanner *scanner);
+
+/**
+ * Lex a token from the stream of a scanner.
+ * @param category_out Return parameter for the syntactic category of the
+ * token.
+ * @return The malloc-allocated lexeme; can be freed with free. NULL if the
+ * scanner failed to find a token.
+ */
+char *pylex_scan(struct pylex_scanner *scanner, int *category_out);
+
+/**
+ * Lex a token from the given stream with a scanner shared by the whole
+ * program; the scanner is reset whenever a different stream is passed. This
+ * function is not thread-safe.
+ * @param category_out Return parameter for the syntactic category of the
+ * token.
+ * @return The malloc-allocated lexeme; can be freed with free. NULL if the
+ * scanner failed to find a token.
+ */
+char *pylex(FILE *file, int *category_out);
+
+/**
+ * Lex a token from a buffer in memory without allocating. This function is
+ * thread-safe.
+ * @param buf The input.
+ * @param len The length of the input.
+ * @param pos The offset in the input to lex the token at; advanced past the
+ * token.
+ * @param start_out Return parameter for the offset of the start of the token.
+ * @param end_out Return parameter for the offset of the end of the token.
+ * @return The syntactic category of the token. -1 if the scanner failed to
+ * find a token, including at the end of the input.
+ */
+int pylex_buffer(const char *buf, size_t len, size_t *pos,
+                 size_t *start_out, size_t *end_out);
+
+#endif /* PYLEX_H */
+"""
 
-        includes = \
+    def _c_includes(self):
+        return \
 """\
+#include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 """
 
-        tables = \
-"""
-static int accepting[] = {};
-static int transitions[][{}] = {};
-""".format(initializer_list(self._accepting), NUM_SYMBOLS,
-           nested_initializer_list(self._table))
+    def _c_matcher(self):
+        """Return the C source code for the function which matches a single
+        token:
+
+        /*
+         * Find the longest token at the beginning of a buffer.
+         * @param buf The input.
+         * @param len The length of the input.
+         * @param token_len Return parameter for the length of the token.
+         * @param at_end Return parameter set to whether the DFA was still
+         * running when it reached the end of the input, i.e., whether more
+         * input could result in a longer token.
+         * @return The category of the token, or 0 if there is no token.
+         */
+        static int pylex_match(const unsigned char *buf, size_t len,
+                               size_t *token_len, int *at_end);
+        """
 
-        body = \
+        raise NotImplementedError
+
+    def _c_runtime(self):
+        return \
 """
-static int *backtrack_stack = NULL;
-static size_t stack_size = 0;
-static size_t stack_capacity = 0;
-
-#define PUSH_STACK(state) \\
-    do { \\
-        if (stack_size == stack_capacity) { \\
-            if (stack_capacity == 0) \\
-                stack_capacity = 64; \\
-            else \\
-                stack_capacity *= 2; \\
-            backtrack_stack = realloc(backtrack_stack, stack_capacity * sizeof(int)); \\
-            if (!backtrack_stack) { \\
-                fprintf(stderr, "pylex: memory exhausted\\n"); \\
-                exit(EXIT_FAILURE); \\
-            } \\
-        } \\
-        backtrack_stack[stack_size++] = state; \\
-    } while (0);
+#define PYLEX_BUFFER_SIZE 65536
+
+struct pylex_scanner {
+    FILE *file;
+    unsigned char *buffer;
+    size_t buffer_capacity;
+    /* The unconsumed input is buffer[buffer_start..buffer_end). */
+    size_t buffer_start;
+    size_t buffer_end;
+    int eof;
+};
+
+struct pylex_scanner *pylex_create(FILE *file)
+{
+    struct pylex_scanner *scanner = calloc(1, sizeof(*scanner));
+    if (scanner)
+        scanner->file = file;
+    return scanner;
+}
 
-char *pylex(FILE *file, int *category_out)
+void pylex_destroy(struct pylex_scanner *scanner)
+{
+    if (scanner) {
+        free(scanner->buffer);
+        free(scanner);
+    }
+}
+
+static void refill_buffer(struct pylex_scanner *scanner)
 {
-    char *lexeme = NULL;
-    size_t lexeme_size = 0;
-    size_t lexeme_capacity = 0;
-
-#define APPEND_TO_LEXEME(c) \\
-    do { \\
-        if (lexeme_size == lexeme_capacity) { \\
-            if (lexeme_capacity == 0) \\
-                lexeme_capacity = 64; \\
-            else \\
-                lexeme_capacity *= 2; \\
-            lexeme = realloc(lexeme, lexeme_capacity); \\
-            if (!lexeme) { \\
-                fprintf(stderr, "pylex: memory exhausted\\n"); \\
-                exit(EXIT_FAILURE); \\
-            } \\
-        } \\
-        lexeme[lexeme_size++] = c; \\
-    } while (0);
-
-    stack_size = 0;
-
-    int curstate = 0;
-
-    do {
-        char c = getc(file);
-        if (c == EOF)
-            break;
-
-        APPEND_TO_LEXEME(c);
-
-        if (accepting[curstate])
-            stack_size = 0;
-        PUSH_STACK(curstate);
-
-        curstate = transitions[curstate][(unsigned char) c];
-    } while (curstate != -1);
-
-    while (!accepting[curstate] && stack_size > 0) {
-        curstate = backtrack_stack[--stack_size];
-
-        if (ungetc(lexeme[--lexeme_size], file) == EOF) {
-            fprintf(stderr, "pylex: backtracking error\\n");
+    if (scanner->buffer_start > 0) {
+        memmove(scanner->buffer, scanner->buffer + scanner->buffer_start,
+                scanner->buffer_end - scanner->buffer_start);
+        scanner->buffer_end -= scanner->buffer_start;
+        scanner->buffer_start = 0;
+    }
+
+    if (scanner->buffer_end == scanner->buffer_capacity) {
+        if (scanner->buffer_capacity == 0)
+            scanner->buffer_capacity = PYLEX_BUFFER_SIZE;
+        else
+            scanner->buffer_capacity *= 2;
+        scanner->buffer = realloc(scanner->buffer, scanner->buffer_capacity);
+        if (!scanner->buffer) {
+            fprintf(stderr, "pylex: memory exhausted\\n");
             exit(EXIT_FAILURE);
         }
     }
 
-    if (accepting[curstate]) {
-        *category_out = accepting[curstate];
-        APPEND_TO_LEXEME('\\0');
+    size_t n = fread(scanner->buffer + scanner->buffer_end, 1,
+                     scanner->buffer_capacity - scanner->buffer_end, scanner->file);
+    if (n == 0)
+        scanner->eof = 1;
+    scanner->buffer_end += n;
+}
+
+char *pylex_scan(struct pylex_scanner *scanner, int *category_out)
+{
+    for (;;) {
+        size_t token_len;
+        int at_end;
+        int category = pylex_match(scanner->buffer + scanner->buffer_start,
+                                   scanner->buffer_end - scanner->buffer_start,
+                                   &token_len, &at_end);
+
+        if (at_end && !scanner->eof) {
+            /* The token might continue past the buffered input. */
+            refill_buffer(scanner);
+            continue;
+        }
+
+        if (!category) {
+            *category_out = -1;
+            return NULL;
+        }
+
+        char *lexeme = malloc(token_len + 1);
+        if (!lexeme) {
+            fprintf(stderr, "pylex: memory exhausted\\n");
+            exit(EXIT_FAILURE);
+        }
+        memcpy(lexeme, scanner->buffer + scanner->buffer_start, token_len);
+        lexeme[token_len] = '\\0';
+        scanner->buffer_start += token_len;
+
+        *category_out = category;
         return lexeme;
-    } else {
-        *category_out = -1;
-        return NULL;
     }
 }
+
+int pylex_buffer(const char *buf, size_t len, size_t *pos,
+                 size_t *start_out, size_t *end_out)
+{
+    size_t token_len;
+    int at_end;
+    int category = pylex_match((const unsigned char *)buf + *pos, len - *pos,
+                               &token_len, &at_end);
+
+    if (!category)
+        return -1;
+
+    *start_out = *pos;
+    *pos += token_len;
+    *end_out = *pos;
+    return category;
+}
+
+static struct pylex_scanner default_scanner;
+
+char *pylex(FILE *file, int *category_out)
+{
+    char *lexeme;
+
+    if (file != default_scanner.file) {
+        default_scanner.file = file;
+        default_scanner.buffer_start = default_scanner.buffer_end = 0;
+        default_scanner.eof = 0;
+    }
+    lexeme = pylex_scan(&default_scanner, category_out);
+    if (!lexeme) {
+        /* Start over on the next call, even if it is for another file which
+           was opened at the same address after this one was closed. */
+        default_scanner.file = NULL;
+        default_scanner.buffer_start = default_scanner.buffer_end = 0;
+        default_scanner.eof = 0;
+    }
+    return lexeme;
+}
 """
 
-        return includes + tables + body
+
+class TableDrivenScannerGenerator(_ScannerGenerator):
+    """Scanner generator for a table-driven scanner.
+
+    Every table uses the smallest integer type which can hold its values. The
+    transition table is either a full two-dimensional array indexed by state
+    and symbol class or, if compression is enabled, a row-displacement
+    (a.k.a. comb-vector) table: each state may have a default state whose
+    transitions it shares, and the remaining transitions of all of the states
+    are interleaved in the next and check arrays at an offset given by base.
+
+    """
+
+    def __init__(self, dfa, compress=False):
+        """Create a table-driven scanner generator.
+
+        Arguments:
+        dfa -- The DFA or CompactDFA to generate a scanner for.
+        compress -- Whether to compress the transition table.
+
+        """
+
+        super().__init__(dfa)
+        self._compress = compress
+
+    def _c_matcher(self):
+        initializer_list = _c_initializer_list
+        nested_initializer_list = _c_nested_initializer_list
+
+        tables = \
+"""
+static const {} symbol_classes[{}] = {};
+static const {} accepting[] = {};
+""".format(_c_int_type(self._symbol_classes), NUM_SYMBOLS,
+           initializer_list(self._symbol_classes),
+           _c_int_type(self._accepting), initializer_list(self._accepting))
+
+        if self._compress:
+            (base, default, next, check) = self._comb_vector()
+            tables += \
+"""static const {} base[] = {};
+static const {} default_state[] = {};
+static const {} next[] = {};
+static const {} check[] = {};
+""".format(_c_int_type(base), initializer_list(base),
+           _c_int_type(default), initializer_list(default),
+           _c_int_type(next), initializer_list(next),
+           _c_int_type(check), initializer_list(check))
+
+            transition = \
+"""        int c = symbol_classes[*p++];
+        while (state != -1 && check[base[state] + c] != state)
+            state = default_state[state];
+        if (state != -1)
+            state = next[base[state] + c];"""
+        else:
+            tables += \
+"""static const {} transitions[][{}] = {};
+""".format(_c_int_type(v for row in self._table for v in row), self._num_classes,
+           nested_initializer_list(self._table))
+
+            transition = \
+"""        state = transitions[state][symbol_classes[*p++]];"""
+
+        matcher = \
+"""
+static int pylex_match(const unsigned char *buf, size_t len,
+                       size_t *token_len, int *at_end)
+{{
+    const unsigned char *p = buf, *end = buf + len;
+    int state = 0;
+    int category = 0;
+
+    /* Only the last accepting position is needed to backtrack. */
+    *token_len = 0;
+    while (p < end) {{
+{}
+        if (state == -1) {{
+            *at_end = 0;
+            return category;
+        }}
+        if (accepting[state]) {{
+            category = accepting[state];
+            *token_len = p - buf;
+        }}
+    }}
+
+    *at_end = 1;
+    return category;
+}}
+""".format(transition)
+
+        return tables + matcher
+
+    def _comb_vector(self):
+        """Compress the transition table into row-displacement form.
+
+        Returns:
+        A (base, default, next, check) tuple of lists. The transition from
+        state s on class c is next[base[s] + c] if check[base[s] + c] == s;
+        otherwise, it is the transition from default[s] on c, or -1 if
+        default[s] is -1.
+
+        """
+
+        num_classes = self._num_classes
+        rows = self._table
+
+        # Choose a default state for each state among recent states with the
+        # same most common transition, minimizing the number of transitions
+        # which differ from the default state's.
+        default = [-1] * len(rows)
+        entries = []
+        candidates = {}
+        for (s, row) in enumerate(rows):
+            best = [c for c in range(num_classes) if row[c] != -1]
+
+            common = max(set(row), key=row.count)
+            recent = candidates.setdefault(common, [])
+            for d in reversed(recent):
+                differences = [c for c in range(num_classes) if row[c] != rows[d][c]]
+                if len(differences) < len(best):
+                    (default[s], best) = (d, differences)
+            recent.append(s)
+            del recent[:-32]
+
+            entries.append(best)
+
+        # Pack the rows into the next and check vectors, first fit, placing
+        # the states with the most entries first.
+        base = [0] * len(rows)
+        next = []
+        check = []
+        first_free = 0
+        for s in sorted(range(len(rows)), key=lambda s: -len(entries[s])):
+            if not entries[s]:
+                continue
+
+            b = first_free - entries[s][0]
+            while True:
+                if b >= 0 and all(b + c >= len(check) or check[b + c] == -1
+                                  for c in entries[s]):
+                    break
+                b += 1
+
+            for c in entries[s]:
+                while len(check) <= b + c:
+                    next.append(-1)
+                    check.append(-1)
+                next[b + c] = rows[s][c]
+                check[b + c] = s
+            base[s] = b
+
+            while first_free < len(check) and check[first_free] != -1:
+                first_free += 1
+
+        # Every base + class index must be within the vectors.
+        padding = max(base) + num_classes - len(check)
+        next.extend([-1] * padding)
+        check.extend([-1] * padding)
+
+        return (base, default, next, check)
+
+
+class DirectCodedScannerGenerator(_ScannerGenerator):
+    """Scanner generator for a direct-coded scanner.
+
+    Each state of the DFA becomes a labeled block of code which records the
+    token if the state is accepting and then jumps to the block for the next
+    state, so the only memory the scanner reads besides the input is the
+    code itself. The next state is chosen either by a switch on the input
+    byte or, with computed gotos (a GNU C extension supported by GCC and
+    Clang), by a jump through a table of label addresses.
+
+    """
+
+    def __init__(self, dfa, computed_goto=False):
+        """Create a direct-coded scanner generator.
+
+        Arguments:
+        dfa -- The DFA or CompactDFA to generate a scanner for.
+        computed_goto -- Whether to dispatch with computed gotos instead of
+        switch statements.
+
+        """
+
+        super().__init__(dfa)
+        self._computed_goto = computed_goto
+
+    def _c_matcher(self):
+        # Only emit labels which are jumped to, as unused labels cause
+        # warnings.
+        targets = {target for row in self._table for target in row if target >= 0}
+        # A switch always has a default case, but a jump table only refers to
+        # no_transition if some transition is missing.
+        rejects = not self._computed_goto or any(target < 0 for row in self._table
+                                                 for target in row)
+
+        code = []
+        if self._computed_goto:
+            code.append('    static const void *const jumps[][{}] = {{'.format(self._num_classes))
+            for row in self._table:
+                labels = ('&&state_{}'.format(target) if target >= 0 else '&&no_transition'
+                          for target in row)
+                code.append('        ' + _c_initializer_list(labels) + ',')
+            code.append('    };')
+            code.append('')
+
+        for (state, row) in enumerate(self._table):
+            accepting = self._accepting[state]
+            if state == 0 and state in targets and accepting:
+                # The empty token is never recognized, so entering the
+                # scanner skips the initial state's accepting actions.
+                code.append('    goto dispatch_0;')
+            if state in targets:
+                code.append('state_{}:'.format(state))
+                if accepting:
+                    code.append('    category = {};'.format(accepting))
+                    code.append('    *token_len = p - buf;')
+            if state == 0 and state in targets and accepting:
+                code.append('dispatch_0:')
+
+            code.append('    if (p == end)')
+            code.append('        goto end_of_input;')
+            if self._computed_goto:
+                code.append('    goto *jumps[{}][symbol_classes[*p++]];'.format(state))
+            else:
+                code.extend(self._c_switch(row))
+
+        no_transition = ''
+        if rejects:
+            no_transition = \
+"""
+no_transition:
+    *at_end = 0;
+    return category;
+"""
+
+        tables = ''
+        if self._computed_goto:
+            tables = \
+"""
+static const {} symbol_classes[{}] = {};
+""".format(_c_int_type(self._symbol_classes), NUM_SYMBOLS,
+           _c_initializer_list(self._symbol_classes))
+
+        return tables + \
+"""
+static int pylex_match(const unsigned char *buf, size_t len,
+                       size_t *token_len, int *at_end)
+{{
+    const unsigned char *p = buf, *end = buf + len;
+    int category = 0;
+
+    /* Only the last accepting position is needed to backtrack. */
+    *token_len = 0;
+{}
+{}
+end_of_input:
+    *at_end = 1;
+    return category;
+}}
+""".format('\n'.join(code), no_transition)
+
+    def _c_switch(self, row):
+        """Return the lines of a switch statement which jumps to the next
+        state from a state with the given transitions.
+
+        """
+
+        # Group the bytes by the state they lead to.
+        cases = {}
+        for (b, c) in enumerate(self._symbol_classes):
+            if row[c] >= 0:
+                cases.setdefault(row[c], []).append(b)
+
+        lines = ['    switch (*p++) {']
+        for (target, symbols) in sorted(cases.items()):
+            for i in range(0, len(symbols), 8):
+                lines.append('    ' + ' '.join('case {}:'.format(b) for b in symbols[i:i + 8]))
+            lines.append('        goto state_{};'.format(target))
+        lines.append('    default:')
+        lines.append('        goto no_transition;')
+        lines.append('    }')
+        return lines
+
+
+def _c_initializer_list(l):
+    return '{{{}}}'.format(', '.join(str(x) for x in l))
+
+
+def _c_nested_initializer_list(ll):
+    initializer_lists = ('    ' + _c_initializer_list(l) + ',' for l in ll)
+    return '{{\n{}\n}}'.format('\n'.join(initializer_lists))
+
+
+def _c_int_type(values):
+    """Return the smallest C integer type which can hold all of the given
+    values.
+
+    >>> _c_int_type([0, 255])
+    'uint8_t'
+    >>> _c_int_type([-1, 200])
+    'int16_t'
+    """
+
+    values = list(values)
+    (low, high) = (min(values, default=0), max(values, default=0))
+    for bits in (8, 16, 32):
+        if low >= 0 and high < 1 << bits:
+            return 'uint{}_t'.format(bits)
+        if -(1 << (bits - 1)) <= low and high < 1 << (bits - 1):
+            return 'int{}_t'.format(bits)
+    return 'int64_t'
@@ -0,0 +1,286 @@
+"""In-process scanning engine driven by DFA tables."""
+
+import mmap
+import os
+import re
+
+from pylex import NUM_SYMBOLS
+from pylex.rescanner import ScanningError
+
+
+class Scanner:
+    """A greedy scanner which runs the tables of a DFA directly in Python.
+
+    The scanner has the same semantics as the generated C scanner: each token
+    is the longest prefix of the remaining input which the DFA accepts, and its
+    syntactic category is the ID of the rule which accepted it. Empty tokens
+    are never returned.
+
+    """
+
+    def __init__(self, dfa):
+        """Create a scanner which recognizes the same language as the given
+        DFA.
+
+        Arguments:
+        dfa -- A DFA or CompactDFA; it should be minimized for speed.
+
+        """
+
+        self._dfa = dfa.to_compact()
+
+        # A byte to class ID translation table for bytes.translate.
+        self._translation = bytes(self._dfa.alphabet.class_of)
+
+        rows = [self._dfa.row(state) for state in range(self._dfa.num_states)]
+        self._class_tables = self._build_tables(rows)
+        self._byte_tables = None
+
+    def _build_tables(self, rows):
+        """Build the tables used by the scanning loop.
+
+        Arguments:
+        rows -- A list containing the transitions from each state as a sequence
+        indexed by input value (either class ID or byte).
+
+        Returns:
+        A (transitions, accepting, skips) tuple. The scanning loop refers to
+        each state by the offset of its row in the flat transitions list so
+        that a transition is a single lookup. accepting and skips are indexed
+        by the same offsets.
+
+        """
+
+        width = len(rows[0])
+        transitions = []
+        accepting = [0] * (len(rows) * width)
+
+        # Once a state takes a transition back to itself (e.g., inside an
+        # identifier or a run of whitespace), it skips over the rest of the run
+        # of such input values at once with a regular expression.
+        skips = [None] * (len(rows) * width)
+
+        for (state, row) in enumerate(rows):
+            transitions.extend(target * width if target >= 0 else -1 for target in row)
+            accepting[state * width] = self._dfa.accepting[state]
+
+            loops = bytes(c for (c, target) in enumerate(row) if target == state)
+            if loops:
+                pattern = b'[' + b''.join(re.escape(bytes([c])) for c in loops) + b']*'
+                skips[state * width] = re.compile(pattern).match
+
+        return (transitions, accepting, skips)
+
+    def scan(self, data):
+        """Generate the tokens in the given input.
+
+        Arguments:
+        data -- A str or bytes-like object. A str may only contain characters
+        in SIGMA.
+
+        Yields:
+        (category, start, end) tuples, where data[start:end] is the lexeme.
+
+        Raises:
+        ScanningError -- If no token can be matched at some position.
+
+        >>> from pylex.reparser import RegexParser
+        >>> from pylex.rescanner import RegexScanner
+        >>> from pylex.ast import asts_to_nfa
+        >>> asts = RegexParser(RegexScanner('if\\n[a-z]+\\n[ ]+')).parse_top_level()
+        >>> scanner = asts_to_nfa(asts).to_dfa().minimized().to_scanner()
+        >>> list(scanner.scan('if iffy'))
+        [(1, 0, 2), (3, 2, 3), (2, 3, 7)]
+        """
+
+        (classes, limit) = _translate(data, self._translation)
+        yield from self._scan(classes, self._class_tables)
+        if limit is not None:
+            raise ScanningError('no token at offset {}'.format(limit))
+
+    def scan_file(self, file, chunk_size=1 << 20):
+        """Lazily generate the tokens in a file.
+
+        The file is read in large chunks and only the token which is in flight
+        at the end of a chunk is carried over to the next one, so memory use is
+        bounded by the chunk size and the length of the longest token
+        regardless of the size of the file.
+
+        Arguments:
+        file -- A file object opened in either binary or text mode.
+        chunk_size -- The number of bytes or characters to read at a time.
+
+        Yields:
+        (category, lexeme) tuples, where lexeme is bytes or a str depending on
+        the mode of the file.
+
+        Raises:
+        ScanningError -- If no token can be matched at some position.
+
+        """
+
+        buffer = file.read(0)
+        offset = 0
+
+        while True:
+            # If the token in flight is already as large as a chunk, read
+            # enough to at least double it so that rescanning it stays linear.
+            chunk = file.read(max(chunk_size, len(buffer)))
+            data = buffer + chunk
+            (classes, limit) = _translate(data, self._translation)
+            final = not chunk or limit is not None
+
+            pos = 0
+            for (category, start, end) in self._scan(classes, self._class_tables, final, offset):
+                yield (category, data[start:end])
+                pos = end
+
+            if limit is not None:
+                raise ScanningError('no token at offset {}'.format(offset + limit))
+            if final:
+                return
+
+            buffer = data[pos:]
+            offset += pos
+
+    def scan_mapped(self, source, views=False):
+        """Generate the tokens in a file or buffer without copying it.
+
+        The DFA runs directly over the bytes of the source; if the source is a
+        path, the file is memory-mapped so that the input is paged in by the
+        operating system as it is scanned. No memory is allocated per token
+        except for the yielded tuple.
+
+        Arguments:
+        source -- A path to a file, or an object supporting the buffer
+        protocol such as an mmap, memoryview, or bytes object.
+        views -- Whether to yield memoryview slices of the source rather than
+        offsets. If the source is a path, the slices must not be used after the
+        iteration finishes, as the mapping is closed then; otherwise, they
+        remain valid as long as they are referenced.
+
+        Yields:
+        (category, start, end) tuples, or (category, lexeme) tuples where
+        lexeme is a memoryview if views is True.
+
+        Raises:
+        ScanningError -- If no token can be matched at some position.
+
+        """
+
+        if self._byte_tables is None:
+            class_of = self._dfa.alphabet.class_of
+            rows = []
+            for state in range(self._dfa.num_states):
+                row = self._dfa.row(state)
+                rows.append([row[class_of[b]] for b in range(NUM_SYMBOLS)])
+            self._byte_tables = self._build_tables(rows)
+
+        mapping = None
+        if isinstance(source, (str, os.PathLike)):
+            source = mapping = self._map_file(source)
+        buffer = memoryview(source).cast('B')
+
+        try:
+            tokens = self._scan(buffer, self._byte_tables)
+            if views:
+                for (category, start, end) in tokens:
+                    yield (category, buffer[start:end])
+            else:
+                yield from tokens
+        finally:
+            # Close the mapping as soon as scanning stops rather than whenever
+            # the generator is collected.
+            buffer.release()
+            if isinstance(mapping, mmap.mmap):
+                try:
+                    mapping.close()
+                except BufferError:
+                    # Slices of the mapping are still referenced; it is closed
+                    # once they are collected.
+                    pass
+
+    @staticmethod
+    def _map_file(path):
+        """Memory-map the file at the given path read-only."""
+
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped.
+                return b''
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            mapping.madvise(mmap.MADV_SEQUENTIAL)
+        except AttributeError:
+            # Not supported on this platform.
+            pass
+        return mapping
+
+    def _scan(self, data, tables, final=True, offset=0):
+        """Generate the tokens in a sequence of input values.
+
+        Arguments:
+        data -- The input values, either class IDs or bytes.
+        tables -- The tables returned by _build_tables for the same kind of
+        input values.
+        final -- Whether the input ends with the sequence. If not, scanning
+        stops before a token which might continue past the end of the
+        sequence.
+        offset -- The offset of the sequence in the input, for error messages.
+
+        """
+
+        (transitions, accepting, skips) = tables
+        n = len(data)
+        pos = 0
+        while pos < n:
+            state = 0
+            category = 0
+            end = pos
+
+            i = pos
+            while i < n:
+                target = transitions[state + data[i]]
+                if target < 0:
+                    break
+                i += 1
+                if target == state:
+                    i = skips[state](data, i).end()
+                state = target
+                if accepting[state]:
+                    category = accepting[state]
+                    end = i
+            else:
+                if not final:
+                    # The token might continue in the rest of the input.
+                    return
+
+            if not category:
+                raise ScanningError('no token at offset {}'.format(offset + pos))
+
+            yield (category, pos, end)
+            pos = end
+
+
+def _translate(data, translation):
+    """Translate the given input to a bytes object of class IDs.
+
+    Arguments:
+    data -- A str or bytes-like object.
+    translation -- A byte to class ID translation table for bytes.translate.
+
+    Returns:
+    A (classes, limit) tuple. If data is a str containing a character outside
+    of SIGMA, only the characters before it are translated and limit is its
+    index; otherwise, limit is None.
+
+    """
+
+    if isinstance(data, str):
+        try:
+            data = data.encode('latin-1')
+        except UnicodeEncodeError as e:
+            # No token can contain a character outside of the alphabet.
+            return (data[:e.start].encode('latin-1').translate(translation), e.start)
+    return (bytes(data).translate(translation), None)
@@ -0,0 +1,266 @@
+"""Simplification of regular expression ASTs."""
+
+from pylex.ast import (AlternationAST, CharClassAST, ConcatenationAST, KleeneAST, PositiveAST,
+                       SymbolAST)
+
+
+class Simplifier:
+    """Rewrite a list of ASTs to smaller ASTs which match the same languages.
+
+    The ASTs are rebuilt bottom-up with constructors which apply the following
+    rewrites:
+
+    * Hash-consing: structurally equal subtrees are only built once and are
+      shared within and across rules, so they can be compared by identity.
+    * Closures: (r*)*, (r+)* and (r*)+ are r*, and (r+)+ is r+. A closure of
+      an alternation doesn't need closures inside of it: (r*|s)* is (r|s)*.
+    * Alternation: duplicate alternatives are removed, alternatives which
+      match a single symbol from a set are merged into one character class,
+      and common prefixes are factored out through a trie of the terms of
+      the alternatives, so abc|abd becomes ab[cd].
+
+    The constructions still expand a shared subtree each place it occurs, so
+    it is the other rewrites which make the automata smaller; hash-consing
+    makes them cheap.
+
+    """
+
+    def __init__(self, asts):
+        """Create a simplifier for the given list of ASTs."""
+
+        self.asts = asts
+
+        # Maps the key of each node which has been built to the node. The keys
+        # of inner nodes refer to their children by identity, which is safe
+        # since all of the children are kept alive by this table.
+        self._nodes = {}
+
+    def __call__(self):
+        return [self._simplify(ast) for ast in self.asts]
+
+    def _simplify(self, ast):
+        """Return the simplified version of an AST.
+
+        The traversal is in postorder with an explicit stack, so it works for
+        ASTs of any depth.
+
+        """
+
+        results = []
+        for node in ast._postorder():
+            num_children = len(node._children())
+            if num_children:
+                operands = results[-num_children:]
+                del results[-num_children:]
+            else:
+                operands = []
+            results.append(node._simplified(operands, self))
+        return results.pop()
+
+    def _node(self, key, make):
+        """Return the node with the given key, calling make to build it if it
+        doesn't exist yet.
+
+        """
+
+        try:
+            return self._nodes[key]
+        except KeyError:
+            node = self._nodes[key] = make()
+            return node
+
+    def symbol(self, symbol):
+        """Return the node matching the given symbol."""
+
+        return self._node(('symbol', symbol), lambda: SymbolAST(symbol))
+
+    def char_class(self, char_class):
+        """Return the node matching any symbol in a non-empty bitmap."""
+
+        if not char_class & (char_class - 1):
+            return self.symbol(chr(char_class.bit_length() - 1))
+        return self._node(('class', char_class), lambda: CharClassAST(char_class))
+
+    def kleene(self, operand):
+        """Return the Kleene closure of a simplified node."""
+
+        closures = (KleeneAST, PositiveAST)
+        if isinstance(operand, closures):
+            operand = operand.operand
+        elif (isinstance(operand, AlternationAST) and
+              any(isinstance(ast, closures) for ast in operand.operands)):
+            operand = self.alternation([ast.operand if isinstance(ast, closures) else ast
+                                        for ast in operand.operands])
+        return self._node(('kleene', id(operand)), lambda: KleeneAST(operand))
+
+    def positive(self, operand):
+        """Return the positive closure of a simplified node."""
+
+        if isinstance(operand, (KleeneAST, PositiveAST)):
+            return operand
+        return self._node(('positive', id(operand)), lambda: PositiveAST(operand))
+
+    def concatenation(self, operands):
+        """Return the concatenation of a non-empty list of simplified nodes."""
+
+        flattened = []
+        for ast in operands:
+            if isinstance(ast, ConcatenationAST):
+                flattened.extend(ast.operands)
+            else:
+                flattened.append(ast)
+
+        if len(flattened) == 1:
+            return flattened[0]
+        return self._node(('concatenation',) + tuple(map(id, flattened)),
+                          lambda: ConcatenationAST(*flattened))
+
+    def alternation(self, operands):
+        """Return the alternation of a non-empty list of simplified nodes."""
+
+        root = _PrefixTrie()
+        for ast in operands:
+            for alternative in ast.operands if isinstance(ast, AlternationAST) else (ast,):
+                terms = _terms(alternative)
+                # A trailing alternation is expanded so that its alternatives
+                # are factored together with the others, e.g., x(ay|b)|xaz
+                # becomes x(a[yz]|b).
+                if len(terms) > 1 and isinstance(terms[-1], AlternationAST):
+                    for last in terms[-1].operands:
+                        root.insert(terms[:-1] + _terms(last))
+                else:
+                    root.insert(terms)
+        return self._alternatives(self._factor(root))
+
+    def _alternatives(self, alternatives):
+        """Return the alternation of a non-empty list of simplified nodes
+        without factoring their prefixes.
+
+        Duplicate alternatives are removed, and alternatives which match a
+        single symbol from a set are merged into one character class.
+
+        """
+
+        char_class = 0
+        distinct = {}
+        for ast in alternatives:
+            for alternative in ast.operands if isinstance(ast, AlternationAST) else (ast,):
+                if isinstance(alternative, SymbolAST):
+                    char_class |= 1 << ord(alternative.symbol)
+                elif isinstance(alternative, CharClassAST):
+                    char_class |= alternative.char_class
+                else:
+                    distinct.setdefault(id(alternative), alternative)
+
+        alternatives = list(distinct.values())
+        if char_class:
+            alternatives.insert(0, self.char_class(char_class))
+
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return self._node(('alternation',) + tuple(map(id, alternatives)),
+                          lambda: AlternationAST(*alternatives))
+
+    def _factor(self, root):
+        """Build the alternatives for a trie of sequences of terms, factoring
+        out their common prefixes.
+
+        Chains of trie nodes without branches are collapsed into a single
+        prefix, and each node where the sequences branch becomes the
+        alternation of its branches. The trie is traversed with an explicit
+        stack and each node is built once, so this takes linear time in the
+        size of the trie for any depth.
+
+        Returns:
+        A list of the resulting alternatives.
+
+        """
+
+        # Collapse the chains and list the nodes in preorder.
+        order = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            for (term, child) in node.children.values():
+                prefix = [term]
+                while len(child.children) == 1 and not child.end:
+                    [(term, child)] = child.children.values()
+                    prefix.append(term)
+                node.branches.append((prefix, child))
+                stack.append(child)
+
+        # Build the alternatives of every node after those of its children.
+        for node in reversed(order):
+            for (prefix, child) in node.branches:
+                if not child.alternatives:
+                    node.alternatives.append(self.concatenation(prefix))
+                    continue
+                rest = self._alternatives(child.alternatives)
+                if child.end:
+                    # There is no AST for the empty string, so the last term
+                    # of the prefix is moved into the rest: ab|abd becomes
+                    # a(b|bd).
+                    last = prefix.pop()
+                    choices = [last, self.concatenation([last, rest])]
+                    if not prefix:
+                        node.alternatives.extend(choices)
+                        continue
+                    rest = self._alternatives(choices)
+                node.alternatives.append(self.concatenation(prefix + [rest]))
+            # The children aren't needed anymore.
+            node.children = node.branches = None
+
+        return root.alternatives
+
+
+class _PrefixTrie:
+    """Trie of sequences of terms, used by Simplifier._factor.
+
+    Attributes:
+    children -- Dictionary mapping the identity of each term which follows
+    this node to a (term, child node) tuple.
+    end -- Whether a sequence ends at this node.
+    branches -- List of (prefix, child node) tuples, where prefix is the
+    list of terms on a chain of nodes without branches.
+    alternatives -- List of the alternatives built for the sequences which
+    continue after this node.
+
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.end = False
+        self.branches = []
+        self.alternatives = []
+
+    def insert(self, terms):
+        """Add a non-empty sequence of terms to the trie."""
+
+        node = self
+        for term in terms:
+            try:
+                node = node.children[id(term)][1]
+            except KeyError:
+                child = _PrefixTrie()
+                node.children[id(term)] = (term, child)
+                node = child
+        node.end = True
+
+
+def _terms(ast):
+    """Return the terms of a simplified node as a tuple."""
+
+    return ast.operands if isinstance(ast, ConcatenationAST) else (ast,)
+
+
+def simplify(asts):
+    """Simplify a list of ASTs with the Simplifier.
+
+    >>> from pylex.reparser import RegexParser
+    >>> from pylex.rescanner import RegexScanner
+    >>> simplify(RegexParser(RegexScanner('abc|abd\\n((a|b)*)*')).parse_top_level())
+    [ConcatenationAST(SymbolAST('a'), SymbolAST('b'), CharClassAST(0x18000000000000000000000000)), KleeneAST(CharClassAST(0x6000000000000000000000000))]
+    """
+
+    return Simplifier(asts)()
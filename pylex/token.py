@@ -1,6 +1,7 @@
 """Token (lexeme) class."""
 
-from pylex import SIGMA
+from pylex import NUM_SYMBOLS, SIGMA
+from pylex.alphabet import bitmap_to_symbols, symbols_label
 
 
 class Token:
@@ -19,7 +20,8 @@ class Token:
         CHARCLASS -- A character class.
     symbol -- If category is SYMBOL, the corresponding symbol (character) for
     this token.
-    char_class -- If category is CHARCLASS, a set of symbols in the language.
+    char_class -- If category is CHARCLASS, a non-empty bitmap of symbols in
+    the language (see pylex.alphabet.symbols_to_bitmap).
 
     """
 
@@ -50,7 +52,7 @@ class Token:
         Arguments:
         category -- The syntactic category of this token.
         arg -- If category is SYMBOL, a character. If category is CHARCLASS, a
-        collection of characters. Ignored otherwise.
+        bitmap of characters. Ignored otherwise.
 
         """
         self.category = category
@@ -58,8 +60,8 @@ class Token:
             assert len(arg) == 1 and arg in SIGMA
             self.symbol = arg
         elif self.category == Token.CHARCLASS:
-            assert len(arg) >= 1 and all(c in SIGMA for c in arg)
-            self.char_class = set(arg)
+            assert 0 < arg < 1 << NUM_SYMBOLS
+            self.char_class = arg
 
     def is_end(self):
         """Return whether this token is either an EOF or EOL token."""
@@ -70,7 +72,7 @@ class Token:
         if self.category == Token.SYMBOL:
             return 'Token(SYMBOL, {})'.format(repr(self.symbol))
         elif self.category == Token.CHARCLASS:
-            return 'Token(CHARCLASS, {})'.format(repr(self.char_class))
+            return 'Token(CHARCLASS, {:#x})'.format(self.char_class)
         else:
             return 'Token({})'.format(self._category_to_str[self.category])
 
@@ -78,6 +80,6 @@ class Token:
         if self.category == Token.SYMBOL:
             return 'SYMBOL({})'.format(repr(self.symbol))
         elif self.category == Token.CHARCLASS:
-            return 'CHARCLASS({})'.format(repr(self.char_class))
+            return 'CHARCLASS({})'.format(symbols_label(bitmap_to_symbols(self.char_class)))
         else:
             return self._category_to_str[self.category]
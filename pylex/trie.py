@@ -0,0 +1,249 @@
+"""Construction of minimized DFAs for literal rules as tries."""
+
+from array import array
+
+from pylex.alphabet import Alphabet
+from pylex.ast import asts_to_nfa
+from pylex.dfa import CompactDFA
+
+
+class Trie:
+    """Trie construction: build a minimized DFA for a list of literal strings
+    directly, on top of a DFA for the other rules.
+
+    Each literal is a path of states from the initial state, and literals with
+    a common prefix share states, so these states form a tree. A state accepts
+    the lowest rule ID of the literals equal to its prefix. Building the tree
+    takes time linear in the total length of the literals, with no NFA or
+    subset construction.
+
+    The other rules are compiled to a minimized DFA beforehand, and the tree
+    is built as the product of the two: each state of the tree also tracks the
+    state of that DFA after reading its prefix, and takes the transitions of
+    that state on the classes for which it has no child. As the tree is
+    acyclic, the product is minimized bottom-up by merging states with the
+    same accepting ID and transitions, instead of with Hopcroft's algorithm.
+
+    """
+
+    def __init__(self, literals, dfa=None, rule_ids=None):
+        """Create a DFA constructor for the given literals.
+
+        Arguments:
+        literals -- A list of (string, rule ID) pairs.
+        dfa -- An optional minimized DFA or CompactDFA for the other rules.
+        rule_ids -- A list mapping each accepting ID of dfa to a rule ID;
+        required if dfa is given.
+
+        """
+
+        self.literals = literals
+        self.rule_ids = rule_ids
+
+        symbol_sets = [{symbol} for symbol in
+                       set().union(*(literal for (literal, rule_id) in literals))]
+        if dfa is None:
+            self.dfa = None
+            self.alphabet = Alphabet(symbol_sets)
+        else:
+            self.dfa = dfa.to_compact()
+            self.alphabet = Alphabet(symbol_sets + self.dfa.alphabet.classes)
+
+    def __call__(self):
+        self._build_base()
+        self._build_tree()
+        self._merge()
+        return self._build_dfa()
+
+    def _build_base(self):
+        """Copy the states of the DFA for the other rules.
+
+        The states of the product are numbered in self.accepting and
+        self.transitions as follows: 0 is the initial state, the states of the
+        DFA for the other rules come next, and the states of the tree last.
+        The transitions of the states of the DFA are translated to the product
+        alphabet.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        self.accepting = array('i', [0])
+        self.transitions = array('i', [-1]) * num_classes
+
+        if self.dfa is not None:
+            dfa_num_classes = self.dfa.alphabet.num_classes
+            class_of = self.dfa.alphabet.class_of
+            classes = [class_of[ord(self.alphabet.representative(c))]
+                       for c in range(num_classes)]
+
+            for s in range(self.dfa.num_states):
+                self.accepting.append(self.rule_ids[self.dfa.accepting[s]])
+                row = s * dfa_num_classes
+                for d in classes:
+                    target = self.dfa.transitions[row + d]
+                    self.transitions.append(target + 1 if target >= 0 else -1)
+
+            # The initial state starts out as the initial state of the DFA.
+            self.accepting[0] = self.accepting[1]
+            self.transitions[:num_classes] = self.transitions[num_classes:2 * num_classes]
+
+        # The initial state and the states of the DFA are never merged into
+        # other states.
+        self.tree = len(self.accepting)
+
+    def _build_tree(self):
+        """Add the states of the tree.
+
+        self.children maps each state of the tree (and the initial state) to
+        the list of the classes on which it has a child.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        class_of = self.alphabet.class_of
+        accepting = self.accepting
+        transitions = self.transitions
+        tree = self.tree
+        no_transitions = array('i', [-1]) * num_classes
+        self.children = children = {0: []}
+
+        for (literal, rule_id) in self.literals:
+            state = 0
+            for symbol in literal:
+                c = class_of[ord(symbol)]
+                i = state * num_classes + c
+                target = transitions[i]
+                if target < tree:
+                    # A new state of the tree, which continues from the state
+                    # of the DFA that the transition led to, if any.
+                    children[state].append(c)
+                    transitions[i] = len(accepting)
+                    children[len(accepting)] = []
+                    if target >= 0:
+                        accepting.append(accepting[target])
+                        transitions.extend(transitions[target * num_classes:
+                                                       (target + 1) * num_classes])
+                    else:
+                        accepting.append(0)
+                        transitions.extend(no_transitions)
+                    target = transitions[i]
+                state = target
+
+            if not accepting[state] or rule_id < accepting[state]:
+                accepting[state] = rule_id
+
+    def _merge(self):
+        """Merge equivalent states of the tree.
+
+        The DFA for the other rules is minimal, so its states are pairwise
+        inequivalent. The states of the tree are visited children first, so
+        when a state is visited, its transitions already lead to the
+        representatives of their targets, and it is equivalent to an earlier
+        state if and only if they have the same accepting ID and transitions.
+
+        self.representative maps each state to the state it was merged into.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        accepting = self.accepting
+        transitions = self.transitions
+        self.representative = representative = list(range(len(accepting)))
+
+        signatures = {}
+        for s in range(1, self.tree):
+            row = s * num_classes
+            signatures[(accepting[s], transitions[row:row + num_classes].tobytes())] = s
+
+        for s in [*range(len(accepting) - 1, self.tree - 1, -1), 0]:
+            row = s * num_classes
+            for c in self.children[s]:
+                transitions[row + c] = representative[transitions[row + c]]
+            signature = (accepting[s], transitions[row:row + num_classes].tobytes())
+            representative[s] = signatures.setdefault(signature, s)
+
+    def _build_dfa(self):
+        """Create the DFA from the representative states.
+
+        Only the representatives which can be reached from the initial state
+        are kept, which also drops the states of the DFA for the other rules
+        which can't be reached any more. They keep their relative order.
+
+        """
+
+        num_classes = self.alphabet.num_classes
+        initial = self.representative[0]
+
+        reachable = {initial}
+        worklist = [initial]
+        while worklist:
+            row = worklist.pop() * num_classes
+            for target in set(self.transitions[row:row + num_classes]):
+                if target >= 0 and target not in reachable:
+                    reachable.add(target)
+                    worklist.append(target)
+        reachable.remove(initial)
+        states = [initial] + sorted(reachable)
+
+        # numbers maps each kept state to its new number; the extra last entry
+        # maps -1 to itself.
+        numbers = [-1] * (len(self.accepting) + 1)
+        for (number, s) in enumerate(states):
+            numbers[s] = number
+
+        accepting = array('i', (self.accepting[s] for s in states))
+        transitions = array('i')
+        for s in states:
+            transitions.extend(map(numbers.__getitem__,
+                                   self.transitions[s * num_classes:(s + 1) * num_classes]))
+
+        return CompactDFA(self.alphabet, accepting, transitions)
+
+
+def compile_rules(asts, construct=None):
+    """Compile a list of rules to a minimized DFA, building the DFA for the
+    rules which are literal strings as a trie.
+
+    Rule files often consist mostly of literals, such as keywords and
+    operators. Only the rest of the rules go through the usual construction
+    and minimization; the trie is built on top of their DFA in linear time.
+
+    Arguments:
+    asts -- The list of ASTs, one per rule.
+    construct -- A function which converts a list of ASTs to a DFA or
+    CompactDFA, used for the rules which are not literals. Defaults to
+    Thompson's construction followed by NFA reduction and the subset
+    construction.
+
+    Returns:
+    A minimized CompactDFA equivalent to the one compiled from asts_to_nfa.
+
+    >>> from pylex.reparser import RegexParser
+    >>> from pylex.rescanner import RegexScanner
+    >>> asts = RegexParser(RegexScanner('if\\n[a-z]+\\nin\\n[ ]')).parse_top_level()
+    >>> scanner = compile_rules(asts).to_scanner()
+    >>> list(scanner.scan('if in iffy'))
+    [(1, 0, 2), (4, 2, 3), (2, 3, 5), (4, 5, 6), (2, 6, 10)]
+    """
+
+    literals = []
+    rules = []
+    rule_ids = [0]
+    for (rule_id, ast) in enumerate(asts, 1):
+        literal = ast._literal()
+        if literal is not None:
+            literals.append((literal, rule_id))
+        else:
+            rules.append(ast)
+            rule_ids.append(rule_id)
+
+    if not rules:
+        return Trie(literals)()
+
+    if construct:
+        dfa = construct(rules).minimized()
+    else:
+        dfa = asts_to_nfa(rules).reduced().to_dfa(bitsets=True, compact=True).minimized()
+    if not literals:
+        return dfa
+    return Trie(literals, dfa, rule_ids)()
@@ -0,0 +1,100 @@
+"""Helpers shared by the tests."""
+
+from pylex.ast import ConcatenationAST, PositiveAST, SymbolAST, asts_to_nfa
+from pylex.reparser import RegexParser
+from pylex.rescanner import RegexScanner
+
+# Rules for a small language of keywords, identifiers, numbers and operators.
+RULES = ['if', '[a-z]([a-z0-9])*', '[0-9]+', '[ \t]+', 'a+b', '...', '.']
+
+
+def parse(regexes):
+    """Parse a list of regular expressions, one per rule, to a list of ASTs."""
+
+    return RegexParser(RegexScanner('\n'.join(regexes))).parse_top_level()
+
+
+def compile_nfa(regexes):
+    """Compile a list of regular expressions to an NFA with Thompson's
+    construction.
+
+    """
+
+    return asts_to_nfa(parse(regexes))
+
+
+def compile_dfa(regexes):
+    """Compile a list of regular expressions to a minimized CompactDFA."""
+
+    return compile_nfa(regexes).to_dfa(compact=True).minimized()
+
+
+class SameDFAMixin:
+    """Mixin for test cases which compare minimized DFAs."""
+
+    def assertSameDFA(self, a, b):
+        """Assert that two minimized DFAs have the same alphabet, accepting IDs
+        and transition table.
+
+        """
+
+        self.assertEqual(a.alphabet.class_of, b.alphabet.class_of)
+        self.assertEqual(list(a.accepting), list(b.accepting))
+        self.assertEqual(list(a.transitions), list(b.transitions))
+
+
+class ConstructionTests(SameDFAMixin):
+    """Tests shared by the alternatives to Thompson's construction followed
+    by the subset construction.
+
+    Each of them must give the same minimized DFA. Subclasses, which must
+    also derive from unittest.TestCase, define construct(), which converts a
+    list of ASTs to a DFA or CompactDFA.
+
+    """
+
+    # Nesting depth of the AST in test_deep; well past the recursion limit.
+    DEPTH = 10000
+
+    RULES = RULES + ['(a|b)*abb', '"([^"\\\\]|\\\\.)*"', '((a*)*|(b+)+)*c', '[^a-c]+']
+
+    def check(self, regexes):
+        """Check that the construction gives the same minimized DFA for the
+        given regular expressions as compile_dfa.
+
+        Returns:
+        The DFA from the construction, before it is minimized.
+
+        """
+
+        dfa = self.construct(parse(regexes))
+        self.assertSameDFA(dfa.minimized(), compile_dfa(regexes))
+        return dfa
+
+    def test_same_as_thompson(self):
+        self.check(self.RULES)
+        for regex in self.RULES:
+            with self.subTest(regex=regex):
+                self.check([regex])
+        self.check(['(a|b)*abb', 'b+', 'ab*'])
+        self.check(['((a*)*b*)*c', '(a|bc)+(d|e)*'])
+
+    def test_priority(self):
+        scanner = self.check(['if', '[a-z]+', '[ ]+']).to_scanner()
+        self.assertEqual(list(scanner.scan('if iffy')), [(1, 0, 2), (3, 2, 3), (2, 3, 7)])
+
+    def test_nested_closures(self):
+        # A closure directly inside of another one must not let the inner
+        # closure's loop skip over the rest of the outer operand.
+        for regex in ['(([^a])+b)*', '((b)+([ab]|a))*']:
+            with self.subTest(regex=regex):
+                scanner = self.check([regex, '[ab]']).to_scanner()
+                self.assertEqual(list(scanner.scan('b')), [(2, 0, 1)])
+
+    def test_deep(self):
+        ast = SymbolAST('a')
+        for i in range(self.DEPTH):
+            ast = PositiveAST(ConcatenationAST(ast, SymbolAST('b')))
+        dfa = self.construct([ast])
+        data = 'a' + 'b' * self.DEPTH
+        self.assertEqual(list(dfa.to_scanner().scan(data)), [(1, 0, len(data))])
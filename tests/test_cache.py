@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pylex.ast import asts_to_nfa
+from pylex.cache import DFACache, compile_rules
+from tests import compile_dfa, parse
+
+
+class TestDFACache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        cache = DFACache(self.directory)
+        regexes = ['if', '[a-z]+', '[ ]+']
+        key = cache.key(parse(regexes))
+        self.assertIsNone(cache.get(key))
+
+        dfa = compile_dfa(regexes)
+        cache.put(key, dfa)
+        cached = cache.get(key)
+        self.assertEqual(cached.alphabet.class_of, dfa.alphabet.class_of)
+        self.assertEqual(cached.accepting, dfa.accepting)
+        self.assertEqual(cached.transitions, dfa.transitions)
+        self.assertEqual(list(cached.to_scanner().scan('if iffy')),
+                         [(1, 0, 2), (3, 2, 3), (2, 3, 7)])
+
+    def test_key(self):
+        key = DFACache.key(parse(['a(b)', 'c+']))
+        self.assertEqual(DFACache.key(parse(['ab', '(c)+'])), key)
+        self.assertNotEqual(DFACache.key(parse(['c+', 'ab'])), key)
+        self.assertNotEqual(DFACache.key(parse(['ab', 'c*'])), key)
+        self.assertNotEqual(DFACache.key(parse(['ab', 'c+']), [('option', 1)]), key)
+
+    def test_corrupt_entry(self):
+        cache = DFACache(self.directory)
+        key = cache.key(parse(['a']))
+        with open(os.path.join(self.directory, key + '.dfa'), 'wb') as f:
+            f.write(b'garbage')
+        self.assertIsNone(cache.get(key))
+
+    def test_read_only_entry(self):
+        cache = DFACache(self.directory)
+        key = cache.key(parse(['a+']))
+        cache.put(key, compile_dfa(['a+']))
+
+        # The entry can still be used if its time can't be updated.
+        with mock.patch('os.utime', side_effect=PermissionError):
+            self.assertIsNotNone(cache.get(key))
+
+    def test_eviction(self):
+        rules = [['a' * n] for n in range(1, 4)]
+        keys = [DFACache.key(parse(rule)) for rule in rules]
+        cache = DFACache(self.directory)
+        for (n, rule) in enumerate(rules):
+            cache.put(keys[n], compile_dfa(rule))
+            path = os.path.join(self.directory, keys[n] + '.dfa')
+            os.utime(path, (n, n))
+        size = sum(entry.stat().st_size for entry in os.scandir(self.directory))
+
+        # Reading the oldest entry makes it the most recently used.
+        self.assertIsNotNone(cache.get(keys[0]))
+
+        cache.max_size = size
+        key = cache.key(parse(['b']))
+        cache.put(key, compile_dfa(['b']))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(key))
+
+    def test_compile_rules(self):
+        cache = DFACache(self.directory)
+        regexes = ['if', '[a-z]+', '[ ]+']
+        asts = parse(regexes)
+        dfa = compile_rules(asts, cache)
+        self.assertEqual(list(dfa.transitions), list(compile_dfa(regexes).transitions))
+        for ast in asts:
+            self.assertIsNotNone(cache.get(cache.key([ast])))
+
+        # Only the changed rule is compiled again.
+        asts[1] = parse(['[a-z]*'])[0]
+        construct = mock.Mock(wraps=lambda asts: asts_to_nfa(asts).to_dfa(compact=True))
+        dfa = compile_rules(asts, cache, construct)
+        construct.assert_called_once_with([asts[1]])
+        self.assertEqual(list(dfa.transitions),
+                         list(compile_dfa(['if', '[a-z]*', '[ ]+']).transitions))
+        entries = [name for name in os.listdir(self.directory) if name.endswith('.dfa')]
+        self.assertEqual(len(entries), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from pylex.ast import ConcatenationAST, KleeneAST, SymbolAST
+from pylex.derivatives import Derivatives
+from tests import ConstructionTests, parse
+
+
+class TestDerivatives(ConstructionTests, unittest.TestCase):
+    def construct(self, asts):
+        return Derivatives(asts)()
+
+    def test_minimal(self):
+        for regexes in (['(a|b)*abb'], ['ab|cb|db'], ['(a|b)*a(a|b)(a|b)']):
+            with self.subTest(regexes=regexes):
+                dfa = self.check(regexes)
+                self.assertEqual(dfa.num_states, dfa.minimized().num_states)
+
+    def test_nullable(self):
+        dfa = self.check(['a*', 'b'])
+        self.assertEqual(dfa.accepting[0], 1)
+
+    def test_normalization(self):
+        terms = Derivatives(parse(['a']))
+        (a, b) = (terms.symbols(1), terms.symbols(2))
+        self.assertEqual(terms.alternation([a, b]), terms.symbols(3))
+        ab = terms.concatenation(a, b)
+        ba = terms.concatenation(b, a)
+        self.assertEqual(terms.alternation([ab, ba]), terms.alternation([ba, ab, terms.empty]))
+        self.assertEqual(terms.alternation([ab, terms.alternation([ab, ba])]),
+                         terms.alternation([ab, ba]))
+        self.assertEqual(terms.concatenation(terms.epsilon, ab), ab)
+        self.assertEqual(terms.concatenation(ab, terms.empty), terms.empty)
+        self.assertEqual(terms.closure(terms.closure(ab)), terms.closure(ab))
+
+    def test_deep(self):
+        # The number of derivatives of the nested positive closures in the
+        # shared test grows quadratically with the depth. Normalizing (r*)* to
+        # r* keeps it independent of the depth for nested Kleene closures.
+        ast = ConcatenationAST(SymbolAST('a'), SymbolAST('b'))
+        for i in range(10000):
+            ast = KleeneAST(ast)
+        dfa = Derivatives([ast])()
+        self.assertEqual(dfa.num_states, 2)
+        self.assertEqual(list(dfa.to_scanner().scan('abab')), [(1, 0, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
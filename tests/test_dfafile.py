@@ -0,0 +1,74 @@
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from pylex.dfa import DFA, DFAState
+from pylex.dfafile import load_dfa, save_dfa
+from tests import SameDFAMixin, compile_dfa
+
+
+def dump(dfa):
+    f = io.BytesIO()
+    save_dfa(dfa, f)
+    return f.getvalue()
+
+
+class TestDFAFile(SameDFAMixin, unittest.TestCase):
+    def test_round_trip(self):
+        dfa = compile_dfa(['if', '[a-z]+', '[ ]+'])
+        loaded = load_dfa(dump(dfa))
+        self.assertSameDFA(loaded, dfa)
+        self.assertEqual(list(loaded.to_scanner().scan('if iffy')),
+                         [(1, 0, 2), (3, 2, 3), (2, 3, 7)])
+        self.assertEqual(loaded.minimized().num_states, dfa.num_states)
+
+    def test_identity_alphabet(self):
+        initial = DFAState()
+        initial.add_transition(ord('a'), DFAState(1))
+        dfa = DFA(initial).to_compact()
+        data = dump(dfa)
+        # The class map is omitted.
+        self.assertEqual(len(data), 24 + 4 * (2 + 2 * 256))
+        self.assertSameDFA(load_dfa(data), dfa)
+
+    def test_mapped(self):
+        dfa = compile_dfa(['a+b', '(a|b)*c'])
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'scanner.dfa')
+            with open(path, 'wb') as f:
+                save_dfa(dfa, f)
+            loaded = load_dfa(path)
+            self.assertIsInstance(loaded.transitions, memoryview)
+            self.assertSameDFA(loaded, dfa)
+            del loaded
+        finally:
+            shutil.rmtree(directory)
+
+    def test_invalid(self):
+        data = dump(compile_dfa(['ab']))
+        with self.assertRaisesRegex(ValueError, 'not a DFA file'):
+            load_dfa(b'X' + data[1:])
+        with self.assertRaisesRegex(ValueError, 'version'):
+            load_dfa(data[:8] + b'\x02' + data[9:])
+        with self.assertRaisesRegex(ValueError, 'size'):
+            load_dfa(data[:-4])
+        with self.assertRaisesRegex(ValueError, 'truncated'):
+            load_dfa(data[:10])
+
+    def test_invalid_tables(self):
+        dfa = compile_dfa(['ab'])
+        data = dump(dfa)
+        accepting = len(data) - 4 * (dfa.num_states + len(dfa.transitions))
+        with self.assertRaisesRegex(ValueError, 'accepting'):
+            load_dfa(data[:accepting] + struct.pack('<i', -1) + data[accepting + 4:])
+        for target in (-2, dfa.num_states):
+            with self.assertRaisesRegex(ValueError, 'transition'):
+                load_dfa(data[:-4] + struct.pack('<i', target))
+
+
+if __name__ == '__main__':
+    unittest.main()
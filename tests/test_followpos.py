@@ -0,0 +1,22 @@
+import unittest
+
+from pylex.followpos import Followpos
+from tests import ConstructionTests
+
+
+class TestFollowpos(ConstructionTests, unittest.TestCase):
+    def construct(self, asts):
+        return Followpos(asts)()
+
+    def test_classic(self):
+        # The construction gives the minimal DFA for (a|b)*abb directly.
+        dfa = self.check(['(a|b)*abb'])
+        self.assertEqual(dfa.num_states, 4)
+
+    def test_nullable(self):
+        dfa = self.check(['a*', 'b'])
+        self.assertEqual(dfa.accepting[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
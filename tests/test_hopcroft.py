@@ -0,0 +1,74 @@
+import unittest
+
+from pylex.dfa import DFA, DFAState
+from tests import compile_nfa
+
+
+def accepts(dfa, string):
+    state = dfa.initial
+    for c in string:
+        state = state.transitions.get(dfa.alphabet.class_of[ord(c)])
+        if state is None:
+            return None
+    return state.accepting
+
+
+class TestHopcroft(unittest.TestCase):
+    def test_classic(self):
+        dfa = compile_nfa(['(a|b)*abb']).to_dfa().minimized()
+        self.assertEqual(dfa.num_states, 4)
+        self.assertEqual(accepts(dfa, 'abb'), 1)
+        self.assertEqual(accepts(dfa, 'babaabb'), 1)
+        self.assertIsNone(accepts(dfa, 'abba'))
+
+    def test_equivalent_branches(self):
+        dfa = compile_nfa(['ab|cb|db']).to_dfa().minimized()
+        self.assertEqual(dfa.num_states, 3)
+
+    def test_accepting_ids(self):
+        dfa = compile_nfa(['if', '[a-z]+']).to_dfa().minimized()
+        self.assertEqual(accepts(dfa, 'if'), 1)
+        self.assertEqual(accepts(dfa, 'i'), 2)
+        self.assertEqual(accepts(dfa, 'iff'), 2)
+        self.assertEqual(accepts(dfa, 'x'), 2)
+        # Initial state, 'i', 'if' and everything else.
+        self.assertEqual(dfa.num_states, 4)
+
+    def test_dead_states_removed(self):
+        initial = DFAState()
+        accepting = DFAState(1)
+        dead = DFAState()
+        initial.add_transition(0, accepting)
+        initial.add_transition(1, dead)
+        dead.add_transition(1, dead)
+
+        dfa = DFA(initial).minimized()
+        self.assertEqual(dfa.num_states, 2)
+        self.assertEqual(dfa.initial.transitions[0].accepting, 1)
+        self.assertNotIn(1, dfa.initial.transitions)
+
+    def test_empty_language(self):
+        initial = DFAState()
+        initial.add_transition(0, initial)
+
+        dfa = DFA(initial).minimized()
+        self.assertEqual(dfa.num_states, 1)
+        self.assertFalse(dfa.initial.accepting)
+        self.assertEqual(dfa.initial.transitions, {})
+
+    def test_compact(self):
+        nfa = compile_nfa(['(a|b)*abb', 'b+'])
+        compact = nfa.to_dfa(compact=True).minimized()
+        dfa = compact.to_dfa()
+        self.assertEqual(compact.num_states, 6)
+        self.assertEqual(accepts(dfa, 'babb'), 1)
+        self.assertEqual(accepts(dfa, 'bbb'), 2)
+        self.assertIsNone(accepts(dfa, 'ba'))
+
+    def test_minimized_is_minimal(self):
+        dfa = compile_nfa(['(a|b)*a(a|b)(a|b)', 'b+']).to_dfa().minimized()
+        self.assertEqual(dfa.minimized().num_states, dfa.num_states)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from pylex.rescanner import ScanningError
+from tests import RULES, compile_nfa
+
+
+def nth_from_last(n):
+    """Rules for which the DFA has 2 ** n states."""
+
+    return ['(a|b)*a' + '(a|b)' * (n - 1), 'a|b']
+
+
+def tokens(scanner, data):
+    result = []
+    try:
+        for token in scanner.scan(data):
+            result.append(token)
+    except ScanningError as e:
+        result.append(str(e))
+    return result
+
+
+class TestLazyDFA(unittest.TestCase):
+    def check(self, nfa, inputs, max_memory=1 << 22):
+        scanner = nfa.to_dfa(compact=True).minimized().to_scanner()
+        lazy = nfa.to_lazy_dfa(max_memory)
+        for data in inputs:
+            with self.subTest(data=data[:20]):
+                self.assertEqual(tokens(lazy, data), tokens(scanner, data))
+        return lazy
+
+    def test_same_as_dfa(self):
+        lazy = self.check(compile_nfa(RULES), ['if iffy 12 aaab aaa x9\t..', 'abc ? def', '',
+                                               'ifĀ', 'x' * 1000])
+        self.assertEqual(lazy.flushes, 0)
+        self.assertFalse(lazy.simulating)
+
+    def test_flush(self):
+        # Long runs which only need a few states, with bursts which need many.
+        random.seed(0)
+        data = ''.join('a' * 2000 + ''.join(random.choice('ab') for i in range(40))
+                       for j in range(50))
+        lazy = self.check(compile_nfa(nth_from_last(8)), [data], max_memory=1 << 14)
+        self.assertGreater(lazy.flushes, 0)
+        self.assertFalse(lazy.simulating)
+
+    def test_simulation(self):
+        random.seed(0)
+        data = ''.join(random.choice('ab') for i in range(2000))
+        lazy = self.check(compile_nfa(nth_from_last(8)), [data, data + 'c'], max_memory=1 << 12)
+        self.assertTrue(lazy.simulating)
+
+    def test_exponential(self):
+        # The full DFA would have 2 ** 24 states.
+        random.seed(0)
+        data = ''.join(random.choice('ab') for i in range(3000)) + 'a' + 'b' * 23
+        lazy = compile_nfa(nth_from_last(24)).to_lazy_dfa()
+        ((category, start, end),) = lazy.scan(data)
+        self.assertEqual((category, start, end), (1, 0, len(data)))
+        self.assertLessEqual(len(lazy._configs), lazy.max_states)
+
+
+if __name__ == '__main__':
+    unittest.main()
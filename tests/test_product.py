@@ -0,0 +1,34 @@
+import unittest
+
+from pylex.product import ProductConstruction
+from tests import SameDFAMixin, compile_dfa
+
+
+class TestProductConstruction(SameDFAMixin, unittest.TestCase):
+    def check(self, regexes):
+        dfas = [compile_dfa([regex]) for regex in regexes]
+        product = ProductConstruction(dfas)().minimized()
+        self.assertSameDFA(product, compile_dfa(regexes))
+
+    def test_priority(self):
+        dfa = ProductConstruction([compile_dfa([regex]) for regex in ['if', '[a-z]+']])()
+        scanner = dfa.to_scanner()
+        self.assertEqual(list(scanner.scan('if')), [(1, 0, 2)])
+        self.assertEqual(list(scanner.scan('iff')), [(2, 0, 3)])
+
+    def test_same_as_monolithic(self):
+        self.check(['if', '[a-z]([a-z0-9])*', '[0-9]+', '[ \t]+', 'a+b', '...', '.'])
+        self.check(['(a|b)*abb', 'b+', 'ab*'])
+
+    def test_single_rule(self):
+        self.check(['(ab|ac)*d'])
+
+    def test_sparse_states(self):
+        # Every rule but one drops out after the first symbol.
+        regexes = ['{}x*'.format(c) for c in 'abcdefghij']
+        dfa = ProductConstruction([compile_dfa([regex]) for regex in regexes])()
+        self.assertEqual(dfa.num_states, 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from pylex.ast import AlternationAST, SymbolAST, asts_to_nfa
+from tests import compile_nfa
+
+
+def dfa_structure(dfa):
+    """Return a canonical representation of a DFA independent of the state
+    numbering.
+
+    """
+
+    numbers = {dfa.initial: 0}
+    structure = []
+    queue = [dfa.initial]
+    for state in queue:
+        transitions = []
+        for (c, target) in sorted(state.transitions.items()):
+            if target not in numbers:
+                numbers[target] = len(numbers)
+                queue.append(target)
+            transitions.append((c, numbers[target]))
+        structure.append((state.accepting, transitions))
+    return structure
+
+
+class TestRabinScott(unittest.TestCase):
+    RULES = [
+        ['(a|b)*abb'],
+        ['if', 'else', '[a-z]+', '[0-9]+', '[ ]+'],
+        ['(a|b)*a(a|b)(a|b)(a|b)', 'b*a'],
+        ['x(y|z)*x', 'xy+'],
+        ['"[^"]*"', '[^a-c]+', '[a]'],
+    ]
+
+    def test_bitsets_match_sets(self):
+        for rules in self.RULES:
+            with self.subTest(rules=rules):
+                expected = compile_nfa(rules).to_dfa()
+                actual = compile_nfa(rules).to_dfa(bitsets=True)
+                self.assertEqual(dfa_structure(actual), dfa_structure(expected))
+
+    def test_compact_matches_objects(self):
+        for rules in self.RULES:
+            for bitsets in (False, True):
+                with self.subTest(rules=rules, bitsets=bitsets):
+                    expected = compile_nfa(rules).to_dfa(bitsets)
+                    compact = compile_nfa(rules).to_dfa(bitsets, compact=True)
+                    self.assertEqual(compact.num_states, expected.num_states)
+                    self.assertEqual(dfa_structure(compact.to_dfa()), dfa_structure(expected))
+
+    def test_priority(self):
+        dfa = compile_nfa(['if', '[a-z]+']).to_dfa(bitsets=True)
+        classes = dfa.alphabet.class_of
+        state = dfa.initial.transitions[classes[ord('i')]]
+        self.assertEqual(state.accepting, 2)
+        state = state.transitions[classes[ord('f')]]
+        self.assertEqual(state.accepting, 1)
+
+    def test_char_class(self):
+        # A character class is a single transition rather than an alternation.
+        nfa = compile_nfa(['[^a]'])
+        self.assertEqual(nfa.num_states, 3)
+
+        alternation = AlternationAST(*(SymbolAST(chr(c)) for c in range(256) if c != ord('a')))
+        expected = asts_to_nfa([alternation]).to_dfa()
+        for bitsets in (False, True):
+            with self.subTest(bitsets=bitsets):
+                dfa = nfa.to_dfa(bitsets)
+                self.assertEqual(dfa.alphabet.class_of, expected.alphabet.class_of)
+                self.assertEqual(dfa_structure(dfa), dfa_structure(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from pylex.ast import asts_to_nfa
+from pylex.nfa import NFA, NFAState
+from tests import ConstructionTests, compile_nfa
+
+
+class TestReduction(ConstructionTests, unittest.TestCase):
+    # The epsilon closures of the reduction grow with the depth of the nested
+    # closures, so its cost is quadratic.
+    DEPTH = 1500
+
+    def construct(self, asts):
+        return asts_to_nfa(asts).reduced().to_dfa(compact=True)
+
+    def reduce(self, regexes):
+        nfa = compile_nfa(regexes)
+        reduced = nfa.reduced()
+        self.assertLessEqual(reduced.num_states, nfa.num_states)
+        for state in reduced.states:
+            self.assertNotIn(None, state.transitions)
+        for bitsets in (False, True):
+            self.assertSameDFA(reduced.to_dfa(bitsets, compact=True).minimized(),
+                               nfa.to_dfa(bitsets, compact=True).minimized())
+        return reduced
+
+    def test_no_epsilons(self):
+        self.reduce(self.RULES)
+        for regex in self.RULES:
+            with self.subTest(regex=regex):
+                self.reduce([regex])
+
+    def test_classic(self):
+        # (a|b)*abb reduces to the four states of its minimal DFA.
+        reduced = self.reduce(['(a|b)*abb'])
+        self.assertEqual(reduced.num_states, 4)
+
+    def test_merge(self):
+        # The states after the last symbol of each alternative are merged, and
+        # then the states before them, leaving a single branch.
+        reduced = self.reduce(['xab|yab|zab'])
+        self.assertEqual(reduced.num_states, 4)
+
+    def test_trim(self):
+        initial = NFAState()
+        accepting = NFAState(1)
+        dead = NFAState()
+        initial.add_transition('a', accepting)
+        initial.add_transition(None, dead)
+        dead.add_transition('b', dead)
+        initial.add_transition(1 << ord('c'), NFAState())
+
+        reduced = NFA(initial).reduced()
+        self.assertEqual(reduced.num_states, 2)
+        self.assertEqual(list(reduced.initial.transitions), ['a'])
+
+    def test_merge_chain(self):
+        # The initial state is merged into a state which is merged into
+        # another one later.
+        accepting = [2, 1, None, None, 1, 1, None, None, 2, 1]
+        edges = [(0, None, 9), (0, 'b', 4), (0, None, 8), (1, None, 2), (1, 'a', 9),
+                 (1, None, 6), (2, 'a', 4), (3, 'b', 6), (3, None, 0), (4, None, 1),
+                 (4, 'b', 3), (5, None, 2), (5, 'a', 8), (5, None, 1), (6, None, 7),
+                 (6, 'b', 3), (6, 'a', 1), (7, 'a', 0), (7, 'a', 8), (7, 'b', 4),
+                 (8, None, 1), (8, 'b', 2), (8, 'b', 6), (9, 'b', 9), (9, None, 0)]
+        states = [NFAState(accepting) for accepting in accepting]
+        for (s, symbol, t) in edges:
+            states[s].add_transition(symbol, states[t])
+
+        nfa = NFA(states[0])
+        reduced = nfa.reduced()
+        self.assertSameDFA(reduced.to_dfa(compact=True).minimized(),
+                           nfa.to_dfa(compact=True).minimized())
+
+    def test_lazy_dfa(self):
+        nfa = compile_nfa(self.RULES).reduced()
+        scanner = nfa.to_lazy_dfa()
+        self.assertEqual(list(scanner.scan('if x1 "a\\"b"')),
+                         list(nfa.to_dfa(compact=True).minimized().to_scanner().scan('if x1 "a\\"b"')))
+
+
+if __name__ == '__main__':
+    unittest.main()
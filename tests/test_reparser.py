@@ -0,0 +1,51 @@
+import unittest
+
+from pylex.ast import AlternationAST, CharClassAST, ConcatenationAST, KleeneAST, SymbolAST
+from pylex.reparser import ParsingError
+from tests import parse
+
+
+class TestRegexParser(unittest.TestCase):
+    def test_char_class_concatenation(self):
+        [ast] = parse(['"[^"]*"'])
+        self.assertIsInstance(ast, ConcatenationAST)
+        self.assertEqual(len(ast.operands), 3)
+        self.assertIsInstance(ast.operands[1], KleeneAST)
+        self.assertIsInstance(ast.operands[1].operand, CharClassAST)
+
+        [ast] = parse(['[ab][cd]'])
+        self.assertEqual(len(ast.operands), 2)
+
+    def test_flat_nodes(self):
+        [ast] = parse(['a(bc)d|(e|f)|g'])
+        self.assertIsInstance(ast, AlternationAST)
+        self.assertEqual(len(ast.operands), 4)
+        self.assertEqual(len(ast.operands[0].operands), 4)
+
+    def test_long_literal(self):
+        [ast] = parse(['a' * 100000])
+        self.assertIsInstance(ast, ConcatenationAST)
+        self.assertEqual(len(ast.operands), 100000)
+
+    def test_many_alternatives(self):
+        [ast] = parse(['|'.join('k{}'.format(i) for i in range(100000))])
+        self.assertIsInstance(ast, AlternationAST)
+        self.assertEqual(len(ast.operands), 100000)
+
+    def test_deep_nesting(self):
+        [ast] = parse(['(' * 100000 + 'a' + ')*' * 100000])
+        for i in range(100000):
+            self.assertIsInstance(ast, KleeneAST)
+            ast = ast.operand
+        self.assertIsInstance(ast, SymbolAST)
+        self.assertEqual(ast.symbol, 'a')
+
+    def test_errors(self):
+        for regex in ['(a', '((a)', 'a|', '|a', '()', 'a**', 'a)', '*']:
+            with self.subTest(regex=regex):
+                with self.assertRaises(ParsingError):
+                    parse([regex])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
+import io
 import unittest
 
 from pylex import SIGMA
+from pylex.alphabet import symbols_to_bitmap
 from pylex.rescanner import RegexScanner, ScanningError
 from pylex.token import Token
 
+
 class TestRegexScanner(unittest.TestCase):
     def test_eof(self):
         scanner = RegexScanner('')
@@ -84,33 +87,33 @@ class TestRegexScanner(unittest.TestCase):
         scanner.lex()
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {'a', 'b', 'c'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({'a', 'b', 'c'}))
 
         scanner = RegexScanner('[^abc]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {'a', 'b', 'c'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {'a', 'b', 'c'}))
 
     def test_closing_bracket_in_char_class(self):
         scanner = RegexScanner('[]]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {']'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({']'}))
 
         scanner = RegexScanner('[]3]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {']', '3'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({']', '3'}))
 
         scanner = RegexScanner('[^]]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {']'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {']'}))
 
         scanner = RegexScanner('[^]3]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {']', '3'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {']', '3'}))
 
     def test_char_class_range(self):
         expected = {chr(c) for c in range(ord('a'), ord('z') + 1)}
@@ -118,67 +121,67 @@ class TestRegexScanner(unittest.TestCase):
         scanner = RegexScanner('[a-z]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, expected)
+        self.assertEqual(token.char_class, symbols_to_bitmap(expected))
 
         scanner = RegexScanner('[^a-z]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - expected)
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - expected))
 
         expected |= {chr(c) for c in range(ord('0'), ord('9') + 1)}
 
         scanner = RegexScanner('[a-z0-9]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, expected)
+        self.assertEqual(token.char_class, symbols_to_bitmap(expected))
 
         scanner = RegexScanner('[^a-z0-9]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - expected)
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - expected))
 
     def test_hyphen_in_char_class(self):
         scanner = RegexScanner('[-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {'-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({'-'}))
 
         scanner = RegexScanner('[^-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {'-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {'-'}))
 
     def test_hyphen_and_bracket_in_char_class(self):
         scanner = RegexScanner('[]-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {']', '-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({']', '-'}))
 
         scanner = RegexScanner('[^]-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {']', '-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {']', '-'}))
 
     def test_trailing_hyphen_in_char_class(self):
         scanner = RegexScanner('[a-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {'a', '-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({'a', '-'}))
 
         scanner = RegexScanner('[-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {'-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({'-'}))
 
         scanner = RegexScanner('[^a-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {'a', '-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {'a', '-'}))
 
         scanner = RegexScanner('[^-]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {'-'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {'-'}))
 
     def test_unmatched_bracket_in_char_class(self):
         scanner = RegexScanner('[a-')
@@ -202,20 +205,43 @@ class TestRegexScanner(unittest.TestCase):
         scanner = RegexScanner('[a^]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {'a', '^'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({'a', '^'}))
 
         scanner = RegexScanner('[^a^]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {'a', '^'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {'a', '^'}))
 
     def test_backslash_in_char_class(self):
         scanner = RegexScanner(r'[\n]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, {'\\', 'n'})
+        self.assertEqual(token.char_class, symbols_to_bitmap({'\\', 'n'}))
 
         scanner = RegexScanner(r'[^\n]')
         token = scanner.lex()
         self.assertEqual(token.category, Token.CHARCLASS)
-        self.assertEqual(token.char_class, set(SIGMA) - {'\\', 'n'})
+        self.assertEqual(token.char_class, symbols_to_bitmap(set(SIGMA) - {'\\', 'n'}))
+
+    def test_file_input(self):
+        regexes = 'if\n[a-z]+\n' * 50000
+        scanner = RegexScanner(io.StringIO(regexes))
+        count = 0
+        while scanner.lex().category != Token.EOF:
+            count += 1
+        self.assertEqual(count, 50000 * 6)
+        self.assertEqual(scanner.line, 100001)
+        scanner.close()
+
+    def test_error_position(self):
+        scanner = RegexScanner('ab\ncd[z-a]')
+        for i in range(5):
+            scanner.lex()
+        with self.assertRaisesRegex(ScanningError, 'line 2, column 6'):
+            scanner.lex()
+
+        scanner = RegexScanner(io.StringIO('a\n\n[^a-'))
+        for i in range(3):
+            scanner.lex()
+        with self.assertRaisesRegex(ScanningError, 'line 3, column 4'):
+            scanner.lex()
@@ -0,0 +1,276 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from pylex.rescanner import ScanningError
+from pylex.scangen import DirectCodedScannerGenerator, TableDrivenScannerGenerator
+from tests import RULES, compile_dfa
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+CC = os.environ.get('CC') or shutil.which('cc') or shutil.which('gcc')
+
+
+# Scans the files given as arguments with one scanner each, alternating between
+# them, and prints each token prefixed with the index of its file.
+INTERLEAVED_DRIVER = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include "pylex.h"
+
+int main(int argc, char *argv[])
+{
+    struct pylex_scanner *scanners[2];
+    FILE *files[2];
+    int done[2] = {0, 0};
+    int i;
+
+    for (i = 0; i < 2; i++) {
+        files[i] = fopen(argv[i + 1], "rb");
+        scanners[i] = pylex_create(files[i]);
+        if (!files[i] || !scanners[i])
+            return EXIT_FAILURE;
+    }
+
+    while (!done[0] || !done[1]) {
+        for (i = 0; i < 2; i++) {
+            char *lexeme;
+            int category;
+
+            if (done[i])
+                continue;
+            lexeme = pylex_scan(scanners[i], &category);
+            if (!lexeme) {
+                done[i] = 1;
+                continue;
+            }
+            printf("%d %d: %s\n", i, category, lexeme);
+            free(lexeme);
+        }
+    }
+
+    for (i = 0; i < 2; i++) {
+        pylex_destroy(scanners[i]);
+        fclose(files[i]);
+    }
+    return EXIT_SUCCESS;
+}
+"""
+
+
+# Scans the files given as arguments one after the other with pylex, closing
+# each one before opening the next, and prints each token prefixed with the
+# index of its file.
+SEQUENTIAL_DRIVER = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include "pylex.h"
+
+int main(int argc, char *argv[])
+{
+    int i;
+
+    for (i = 1; i < argc; i++) {
+        FILE *file = fopen(argv[i], "rb");
+        char *lexeme;
+        int category;
+
+        if (!file)
+            return EXIT_FAILURE;
+        while ((lexeme = pylex(file, &category))) {
+            printf("%d %d: %s\n", i - 1, category, lexeme);
+            free(lexeme);
+        }
+        fclose(file);
+    }
+    return EXIT_SUCCESS;
+}
+"""
+
+
+# Scans all of standard input in memory and prints the offsets of each token.
+BUFFER_DRIVER = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include "pylex.h"
+
+int main(void)
+{
+    static char buf[1 << 20];
+    size_t len = fread(buf, 1, sizeof(buf), stdin);
+    size_t pos = 0, start, end;
+    int category;
+
+    while ((category = pylex_buffer(buf, len, &pos, &start, &end)) != -1)
+        printf("%d %zu %zu\n", category, start, end);
+    return EXIT_SUCCESS;
+}
+"""
+
+
+def c_repr(lexeme):
+    """Return the lexeme in the format printed by examples/cpylex.c."""
+
+    escapes = {'\0': '\\0', '\a': '\\a', '\b': '\\b', '\t': '\\t', '\n': '\\n',
+               '\v': '\\v', '\f': '\\f', '\r': '\\r', '\\': '\\\\'}
+    return "'{}'".format(''.join(escapes.get(c, c) for c in lexeme))
+
+
+@unittest.skipUnless(CC, 'no C compiler available')
+class TestScannerGenerators(unittest.TestCase):
+    INPUTS = [
+        'if iffy 12 aaab aaa x9\t..',
+        'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa.....',
+        '',
+        'abc ? def',
+        ' '.join(['word', 'aab', '..', '...', '42']) * 20000,
+    ]
+
+    def setUp(self):
+        self.dfa = compile_dfa(RULES)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def build(self, source, driver=os.path.join(EXAMPLES, 'cpylex.c')):
+        path = os.path.join(self.tmpdir, 'pylex.c')
+        with open(path, 'w') as f:
+            f.write(source)
+        with open(os.path.join(self.tmpdir, 'pylex.h'), 'w') as f:
+            f.write(TableDrivenScannerGenerator(self.dfa).c_header())
+        binary = os.path.join(self.tmpdir, 'cpylex')
+        subprocess.run([CC, '-Wall', '-Werror', '-O1', '-o', binary, driver, path], check=True)
+        return binary
+
+    def expected(self, data):
+        lines = []
+        scanner = self.dfa.to_scanner()
+        try:
+            for (category, start, end) in scanner.scan(data):
+                lines.append('{}: {}'.format(category, c_repr(data[start:end])))
+        except ScanningError:
+            pass
+        return lines
+
+    def check(self, generator):
+        binary = self.build(generator.c_source())
+        for data in self.INPUTS:
+            with self.subTest(data=data[:20]):
+                output = subprocess.run([binary], input=data.encode(), stdout=subprocess.PIPE,
+                                        check=True).stdout.decode()
+                self.assertEqual(output.splitlines(), self.expected(data))
+
+    def test_table_driven(self):
+        self.check(TableDrivenScannerGenerator(self.dfa))
+
+    def test_compressed(self):
+        self.check(TableDrivenScannerGenerator(self.dfa, compress=True))
+
+    def test_direct_coded(self):
+        self.check(DirectCodedScannerGenerator(self.dfa))
+
+    def test_computed_goto(self):
+        self.check(DirectCodedScannerGenerator(self.dfa, computed_goto=True))
+
+    def test_reentrant(self):
+        driver = os.path.join(self.tmpdir, 'driver.c')
+        with open(driver, 'w') as f:
+            f.write(INTERLEAVED_DRIVER)
+        binary = self.build(TableDrivenScannerGenerator(self.dfa).c_source(), driver)
+
+        inputs = [self.INPUTS[0] * 5000, self.INPUTS[4]]
+        paths = []
+        for (i, data) in enumerate(inputs):
+            paths.append(os.path.join(self.tmpdir, 'input{}'.format(i)))
+            with open(paths[-1], 'w') as f:
+                f.write(data)
+
+        output = subprocess.run([binary] + paths, stdout=subprocess.PIPE,
+                                check=True).stdout.decode()
+        lines = output.split('\n')[:-1]
+        for (i, data) in enumerate(inputs):
+            prefix = '{} '.format(i)
+            tokens = [line[len(prefix):] for line in lines if line.startswith(prefix)]
+            scanner = self.dfa.to_scanner()
+            expected = ['{}: {}'.format(category, data[start:end])
+                        for (category, start, end) in scanner.scan(data)]
+            self.assertEqual(tokens, expected)
+
+    def test_sequential(self):
+        driver = os.path.join(self.tmpdir, 'driver.c')
+        with open(driver, 'w') as f:
+            f.write(SEQUENTIAL_DRIVER)
+        binary = self.build(TableDrivenScannerGenerator(self.dfa).c_source(), driver)
+
+        inputs = [self.INPUTS[0], self.INPUTS[3], self.INPUTS[0]]
+        paths = []
+        for (i, data) in enumerate(inputs):
+            paths.append(os.path.join(self.tmpdir, 'input{}'.format(i)))
+            with open(paths[-1], 'w') as f:
+                f.write(data)
+
+        output = subprocess.run([binary] + paths, stdout=subprocess.PIPE,
+                                check=True).stdout.decode()
+        expected = []
+        for (i, data) in enumerate(inputs):
+            try:
+                for (category, start, end) in self.dfa.to_scanner().scan(data):
+                    expected.append('{} {}: {}'.format(i, category, data[start:end]))
+            except ScanningError:
+                pass
+        self.assertEqual(output.split('\n')[:-1], expected)
+
+    def test_buffer(self):
+        driver = os.path.join(self.tmpdir, 'driver.c')
+        with open(driver, 'w') as f:
+            f.write(BUFFER_DRIVER)
+
+        for generator in (TableDrivenScannerGenerator(self.dfa),
+                          DirectCodedScannerGenerator(self.dfa)):
+            binary = self.build(generator.c_source(), driver)
+            for data in self.INPUTS:
+                with self.subTest(generator=type(generator).__name__, data=data[:20]):
+                    output = subprocess.run([binary], input=data.encode(),
+                                            stdout=subprocess.PIPE, check=True).stdout.decode()
+                    tokens = [tuple(int(x) for x in line.split()) for line in output.splitlines()]
+                    expected = []
+                    try:
+                        expected.extend(self.dfa.to_scanner().scan(data))
+                    except ScanningError:
+                        pass
+                    self.assertEqual(tokens, expected)
+
+    def test_accepting_initial_state(self):
+        self.dfa = compile_dfa(['(ab)*', 'c'])
+        self.check(DirectCodedScannerGenerator(self.dfa))
+
+    def test_total_dfa(self):
+        # Every state has a transition on every byte, so the jump tables never
+        # refer to no_transition.
+        self.dfa = compile_dfa(['(a|[^a])*'])
+        self.check(DirectCodedScannerGenerator(self.dfa))
+        self.check(DirectCodedScannerGenerator(self.dfa, computed_goto=True))
+
+
+class TestCombVector(unittest.TestCase):
+    def test_lookup(self):
+        generator = TableDrivenScannerGenerator(compile_dfa(RULES), compress=True)
+        (base, default, next, check) = generator._comb_vector()
+        for (state, row) in enumerate(generator._table):
+            for (c, target) in enumerate(row):
+                s = state
+                while s != -1 and check[base[s] + c] != s:
+                    s = default[s]
+                self.assertEqual(next[base[s] + c] if s != -1 else -1, target)
+
+    def test_smaller(self):
+        generator = TableDrivenScannerGenerator(compile_dfa(RULES), compress=True)
+        (base, default, next, check) = generator._comb_vector()
+        full = sum(len(row) for row in generator._table)
+        self.assertLess(len(base) + len(default) + len(next) + len(check), full)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import io
+import mmap
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pylex.rescanner import ScanningError
+from pylex.scanner import Scanner
+from tests import compile_dfa
+
+
+def compile_scanner(regexes):
+    return compile_dfa(regexes).to_scanner()
+
+
+class TestScanner(unittest.TestCase):
+    def setUp(self):
+        self.scanner = compile_scanner(['if', '[a-z]([a-z0-9])*', '[0-9]+', '[ ]+'])
+
+    def test_tokens(self):
+        self.assertEqual(list(self.scanner.scan('if x1 42')),
+                         [(1, 0, 2), (4, 2, 3), (2, 3, 5), (4, 5, 6), (3, 6, 8)])
+
+    def test_longest_match(self):
+        self.assertEqual(list(self.scanner.scan('iffy')), [(2, 0, 4)])
+        self.assertEqual(list(self.scanner.scan('i')), [(2, 0, 1)])
+
+    def test_long_runs(self):
+        data = 'a' * 10000 + ' ' * 10000 + '9' * 10000
+        self.assertEqual(list(self.scanner.scan(data)),
+                         [(2, 0, 10000), (4, 10000, 20000), (3, 20000, 30000)])
+
+    def test_backtracking(self):
+        scanner = compile_scanner(['a', 'abcd', 'b', 'c'])
+        self.assertEqual(list(scanner.scan('abcabcd')),
+                         [(1, 0, 1), (3, 1, 2), (4, 2, 3), (2, 3, 7)])
+
+    def test_bytes(self):
+        expected = [(2, 0, 3), (4, 3, 4), (3, 4, 5)]
+        self.assertEqual(list(self.scanner.scan(b'abc 1')), expected)
+        self.assertEqual(list(self.scanner.scan(bytearray(b'abc 1'))), expected)
+        self.assertEqual(list(self.scanner.scan(memoryview(b'abc 1'))), expected)
+
+    def test_empty(self):
+        self.assertEqual(list(self.scanner.scan('')), [])
+
+    def test_error(self):
+        tokens = self.scanner.scan('ab ?')
+        self.assertEqual(next(tokens), (2, 0, 2))
+        self.assertEqual(next(tokens), (4, 2, 3))
+        with self.assertRaises(ScanningError):
+            next(tokens)
+
+    def test_outside_alphabet(self):
+        tokens = self.scanner.scan('ab €')
+        self.assertEqual(next(tokens), (2, 0, 2))
+        self.assertEqual(next(tokens), (4, 2, 3))
+        with self.assertRaises(ScanningError):
+            next(tokens)
+
+
+class TestScanFile(unittest.TestCase):
+    def setUp(self):
+        self.scanner = compile_scanner(['if', '[a-z]([a-z0-9])*', '[0-9]+', '[ ]+', 'a+b'])
+        self.data = 'if iffy 12 aaaab aaa x' * 5
+
+    def expected(self, data):
+        return [(category, data[start:end]) for (category, start, end) in self.scanner.scan(data)]
+
+    def test_chunk_sizes(self):
+        expected = self.expected(self.data)
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 20):
+            with self.subTest(chunk_size=chunk_size):
+                tokens = self.scanner.scan_file(io.StringIO(self.data), chunk_size)
+                self.assertEqual(list(tokens), expected)
+
+    def test_binary(self):
+        data = self.data.encode()
+        tokens = self.scanner.scan_file(io.BytesIO(data), 5)
+        self.assertEqual(list(tokens), self.expected(data))
+
+    def test_long_token(self):
+        data = 'a' * 1000 + ' ' + 'a' * 999 + 'b'
+        tokens = self.scanner.scan_file(io.StringIO(data), 10)
+        self.assertEqual(list(tokens), self.expected(data))
+
+    def test_empty(self):
+        self.assertEqual(list(self.scanner.scan_file(io.BytesIO(b''))), [])
+
+    def test_error(self):
+        tokens = self.scanner.scan_file(io.StringIO('abc def ? ghi'), 4)
+        self.assertEqual(next(tokens), (2, 'abc'))
+        self.assertEqual(next(tokens), (4, ' '))
+        self.assertEqual(next(tokens), (2, 'def'))
+        self.assertEqual(next(tokens), (4, ' '))
+        with self.assertRaisesRegex(ScanningError, 'offset 8'):
+            next(tokens)
+
+    def test_outside_alphabet(self):
+        tokens = self.scanner.scan_file(io.StringIO('abc \u20ac'), 2)
+        self.assertEqual(next(tokens), (2, 'abc'))
+        self.assertEqual(next(tokens), (4, ' '))
+        with self.assertRaisesRegex(ScanningError, 'offset 4'):
+            next(tokens)
+
+
+class TestScanMapped(unittest.TestCase):
+    def setUp(self):
+        self.scanner = compile_scanner(['if', '[a-z]([a-z0-9])*', '[0-9]+', '[ ]+'])
+        self.data = b'if iffy 12 x9 ' * 100
+        self.expected = list(self.scanner.scan(self.data))
+
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_path(self):
+        self.assertEqual(list(self.scanner.scan_mapped(self.path)), self.expected)
+
+    def test_mapping_closed(self):
+        mappings = []
+        map_file = Scanner._map_file
+
+        def record(path):
+            mappings.append(map_file(path))
+            return mappings[-1]
+
+        with mock.patch.object(Scanner, '_map_file', side_effect=record):
+            self.assertEqual(list(self.scanner.scan_mapped(self.path)), self.expected)
+            self.assertTrue(mappings[-1].closed)
+
+            # Also when the scan is abandoned part of the way through.
+            tokens = self.scanner.scan_mapped(self.path, views=True)
+            next(tokens)
+            tokens.close()
+            self.assertTrue(mappings[-1].closed)
+
+    def test_mmap(self):
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                self.assertEqual(list(self.scanner.scan_mapped(mapping)), self.expected)
+
+    def test_views(self):
+        buffer = bytearray(self.data)
+        tokens = list(self.scanner.scan_mapped(memoryview(buffer), views=True))
+        self.assertEqual([(category, view.tobytes()) for (category, view) in tokens],
+                         [(category, self.data[start:end])
+                          for (category, start, end) in self.expected])
+        # The views refer to the original buffer.
+        buffer[0:2] = b'XY'
+        self.assertEqual(tokens[0][1].tobytes(), b'XY')
+        for (category, view) in tokens:
+            view.release()
+
+    def test_empty_file(self):
+        with open(self.path, 'wb'):
+            pass
+        self.assertEqual(list(self.scanner.scan_mapped(self.path)), [])
+
+    def test_error(self):
+        tokens = self.scanner.scan_mapped(b'ab ?')
+        self.assertEqual(next(tokens), (2, 0, 2))
+        self.assertEqual(next(tokens), (4, 2, 3))
+        with self.assertRaisesRegex(ScanningError, 'offset 3'):
+            next(tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+from pylex.ast import (AlternationAST, CharClassAST, ConcatenationAST, KleeneAST, PositiveAST,
+                       SymbolAST, asts_to_alphabet, asts_to_nfa)
+from pylex.simplify import simplify
+from tests import ConstructionTests, parse
+
+
+def count_nodes(ast):
+    return sum(1 for node in ast._postorder())
+
+
+class TestSimplify(ConstructionTests, unittest.TestCase):
+    RULES = ConstructionTests.RULES + ['abc|abd|ab|abd', '(x|y|[a-c])+', 'for|fun|function|f']
+
+    # The epsilon closures of the subset construction grow with the depth of
+    # the nested closures, so its cost is quadratic.
+    DEPTH = 1500
+
+    def construct(self, asts):
+        # Merging alternatives can coarsen the alphabet, so the DFA is built
+        # over the alphabet of the original ASTs.
+        nfa = asts_to_nfa(simplify(asts))
+        nfa.alphabet = asts_to_alphabet(asts)
+        return nfa.to_dfa(compact=True)
+
+    def simplified(self, regexes):
+        self.check(regexes)
+        return simplify(parse(regexes))
+
+    def test_prefix_factoring(self):
+        [ast] = self.simplified(['abc|abd'])
+        self.assertIsInstance(ast, ConcatenationAST)
+        self.assertEqual(len(ast.operands), 3)
+        self.assertIsInstance(ast.operands[2], CharClassAST)
+
+        # a(b|bc[xy]): only the first term is common to all three.
+        [ast] = self.simplified(['abcx|abcy|ab'])
+        self.assertIsInstance(ast, ConcatenationAST)
+        self.assertIsInstance(ast.operands[1], AlternationAST)
+        self.assertEqual(len(ast.operands[1].operands), 2)
+
+    def test_char_class(self):
+        [ast] = self.simplified(['a|[b-d]|e|a'])
+        self.assertIsInstance(ast, CharClassAST)
+
+        [ast] = self.simplified(['a|a'])
+        self.assertIsInstance(ast, SymbolAST)
+
+    def test_closures(self):
+        for regex in ['(a*)*', '(a+)*', '(a*)+', '((a+)*)+']:
+            [ast] = self.simplified([regex])
+            self.assertIsInstance(ast, KleeneAST)
+            self.assertIsInstance(ast.operand, SymbolAST)
+
+        [ast] = self.simplified(['(a+)+'])
+        self.assertIsInstance(ast, PositiveAST)
+        self.assertIsInstance(ast.operand, SymbolAST)
+
+        [ast] = self.simplified(['(a*|bc)*'])
+        self.assertIsInstance(ast.operand, AlternationAST)
+        self.assertIsInstance(ast.operand.operands[0], SymbolAST)
+
+    def test_hash_consing(self):
+        [a, b] = simplify(parse(['(ab)*c', 'x(ab)*']))
+        self.assertIs(a.operands[0], b.operands[1])
+
+    def test_many_alternatives(self):
+        words = ['k{}'.format(i) for i in range(20000)]
+        [ast] = simplify(parse(['|'.join(words)]))
+        self.assertLess(count_nodes(ast), 20000)
+        self.check(['|'.join(words[:500])])
+
+    def test_shared_prefixes(self):
+        # Each alternative shares its prefix with the next one, so the factored
+        # AST nests an alternation for every alternative, while the size of
+        # the original AST is quadratic.
+        n = 1200
+        for suffix in ([SymbolAST('b')], []):
+            with self.subTest(suffix=suffix):
+                ast = AlternationAST(*(ConcatenationAST(*[SymbolAST('a')] * i + suffix)
+                                       for i in range(2, n)))
+                [ast] = simplify([ast])
+                self.assertLess(count_nodes(ast), 5 * n)
+
+        self.check(['|'.join('a' * i + 'b' for i in range(1, 50))])
+        self.check(['|'.join('a' * i for i in range(1, 50))])
+        self.check(['|'.join('x' * i + 'y' for i in range(1, 50)) + '|xz'])
+
+    def test_deep_closures(self):
+        ast = SymbolAST('a')
+        for i in range(10000):
+            ast = KleeneAST(ast)
+        [ast] = simplify([ast])
+        self.assertIsInstance(ast, KleeneAST)
+        self.assertIsInstance(ast.operand, SymbolAST)
+
+
+if __name__ == '__main__':
+    unittest.main()
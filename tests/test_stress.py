@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from pylex.alphabet import Alphabet
+from pylex.ast import ConcatenationAST, PositiveAST, SymbolAST
+from pylex.dfa import DFA, DFAState
+from pylex.scangen import TableDrivenScannerGenerator
+
+
+class TestStress(unittest.TestCase):
+    def check_chain_dfa(self, n):
+        # A chain of states whose transitions alternate between class 0 (every
+        # symbol but 'a') and class 1 ('a'), so it accepts exactly the strings
+        # of length n - 1 which alternate between a symbol other than 'a' and
+        # 'a', starting with the former.
+        states = [DFAState() for i in range(n)]
+        states[-1].accepting = 1
+        for i in range(n - 1):
+            states[i].add_transition(i % 2, states[i + 1])
+        alphabet = Alphabet([{'a'}])
+        self.assertEqual(alphabet.class_of[ord('a')], 1)
+
+        dfa = DFA(states[0], alphabet)
+        self.assertEqual(dfa.num_states, n)
+        self.assertTrue(all(state.number == i for (i, state) in enumerate(states)))
+
+        min_dfa = dfa.minimized()
+        self.assertEqual(min_dfa.num_states, n)
+        self.assertEqual(min_dfa.states[-1].accepting, 1)
+
+        scangen = TableDrivenScannerGenerator(min_dfa)
+        self.assertEqual(len(scangen._table), n)
+
+        with open(os.devnull, 'w') as f:
+            min_dfa.print_graphviz(f)
+
+    def test_chain_dfa(self):
+        self.check_chain_dfa(10 ** 4)
+
+    @unittest.skipUnless(os.environ.get('PYLEX_STRESS'), 'set PYLEX_STRESS to run')
+    def test_million_state_dfa(self):
+        self.check_chain_dfa(10 ** 6)
+
+    def test_deep_ast(self):
+        depth = 10 ** 5
+
+        ast = SymbolAST('a')
+        for i in range(depth):
+            ast = PositiveAST(ConcatenationAST(SymbolAST('b'), ast))
+
+        nfa = ast.to_nfa()
+        # Two states for each symbol and two for each closure.
+        self.assertEqual(nfa.num_states, 4 * depth + 2)
+
+        with open(os.devnull, 'w') as f:
+            nfa.print_graphviz(f)
+
+
+if __name__ == '__main__':
+    unittest.main()
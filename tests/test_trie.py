@@ -0,0 +1,52 @@
+import unittest
+
+from pylex.derivatives import asts_to_dfa
+from pylex.trie import Trie, compile_rules
+from tests import RULES, ConstructionTests, compile_dfa, parse
+
+
+class TestTrie(ConstructionTests, unittest.TestCase):
+    RULES = ConstructionTests.RULES + ['else', 'iffy', '==', '=', 'else']
+
+    # The epsilon closures of the reduction grow with the depth of the nested
+    # closures, so its cost is quadratic.
+    DEPTH = 1500
+
+    def construct(self, asts):
+        return compile_rules(asts)
+
+    def check(self, regexes):
+        dfa = super().check(regexes)
+        # The trie is already minimal.
+        self.assertEqual(dfa.num_states, compile_dfa(regexes).num_states)
+        return dfa
+
+    def test_construct(self):
+        asts = parse(RULES + ['else', 'iffy'])
+        self.assertSameDFA(compile_rules(asts, asts_to_dfa), compile_rules(asts))
+
+    def test_literals_only(self):
+        dfa = self.check(['if', 'in', 'int', 'for', 'fun', '\\+', '\\+\\+', '\\+='])
+        scanner = dfa.to_scanner()
+        self.assertEqual(list(scanner.scan('intif++')), [(3, 0, 3), (1, 3, 5), (7, 5, 7)])
+
+    def test_mixed(self):
+        self.check(['while', '[a-z]+', 'for', 'function', 'fun'])
+        self.check(['[a-z]+', 'if', 'in'])
+        self.check(['(a|b)*abb', 'abb', 'ba', 'b'])
+
+    def test_shared_suffixes(self):
+        # The states for the common suffix 'ing' are shared by all of the words.
+        words = ['sing', 'ring', 'bring', 'thing', 'ping']
+        dfa = Trie([(word, 1) for word in words])()
+        self.assertEqual(dfa.num_states, 7)
+
+    def test_shadowed_literal(self):
+        # A literal shadowed by an earlier rule is never accepted.
+        dfa = self.check(['[a-z]+', 'if', '[ ]'])
+        scanner = dfa.to_scanner()
+        self.assertEqual(list(scanner.scan('if i')), [(1, 0, 2), (3, 2, 3), (1, 3, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()